@@ -0,0 +1,50 @@
+import asyncio
+import datetime as dt
+import json
+import pathlib
+import platform
+import subprocess
+from typing import Any
+
+import click
+import sqlalchemy
+
+from . import suite  # noqa: F401 (registers the benchmarks)
+from .benchmark import Benchmark
+
+
+@click.command()
+@click.argument("names", nargs=-1)
+@click.option("-o", "--output", type=click.Path(path_type=pathlib.Path), help="Write the results as JSON to this file.")
+@click.option("-r", "--repeat", default=10, show_default=True, help="How many times to run each benchmark.")
+@click.option("-w", "--warmup", default=2, show_default=True, help="How many times to run each benchmark beforehand.")
+def main(names: tuple[str, ...], output: pathlib.Path | None, repeat: int, warmup: int) -> None:
+    benchmarks = [benchmark for name, benchmark in Benchmark.benchmarks.items() if not names or name in names]
+    if not benchmarks:
+        raise click.BadParameter(f"no benchmarks match {', '.join(names)}", param_hint="names")
+    results: list[dict[str, Any]] = []
+    for benchmark in benchmarks:
+        result = asyncio.run(benchmark.run(repeat, warmup))
+        results.append(result)
+        click.echo(
+            f"{benchmark.name:<16} {result["mean"] * 1000:>10.3f} ms "
+            f"± {result["stdev"] * 1000:>8.3f} ms {result["operations_per_second"]:>12,.0f} ops/s"
+        )
+    if output:
+        report = {"environment": _environment(), "results": results}
+        output.write_text(json.dumps(report, indent=4))
+
+
+def _environment() -> dict[str, Any]:
+    commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    return {
+        "commit": commit or None,
+        "timestamp": dt.datetime.now(dt.UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlalchemy": sqlalchemy.__version__,
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import pathlib
+import statistics
+import tempfile
+import time
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, ClassVar
+
+from tunqi import Database, Model
+
+type Setup = Callable[[Database], Awaitable[Any]]
+type Operation = Callable[[Any], Awaitable[Any]]
+
+
+class Benchmark:
+
+    benchmarks: ClassVar[dict[str, Benchmark]] = {}
+
+    def __init__(self, name: str, operation: Operation, setup: Setup | None, operations: int, audit: bool) -> None:
+        self.name = name
+        self.operation = operation
+        self.setup = setup
+        self.operations = operations
+        self.audit = audit
+        self.description = (operation.__doc__ or "").strip()
+
+    def __str__(self) -> str:
+        return f"benchmark {self.name!r}"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    @classmethod
+    def register(
+        cls,
+        name: str,
+        *,
+        setup: Setup | None = None,
+        operations: int = 1,
+        audit: bool = False,
+    ) -> Callable[[Operation], Operation]:
+        def decorator(operation: Operation) -> Operation:
+            if name in cls.benchmarks:
+                raise ValueError(f"benchmark {name!r} already exists")
+            cls.benchmarks[name] = cls(name, operation, setup, operations, audit)
+            return operation
+
+        return decorator
+
+    async def run(self, repeat: int, warmup: int) -> dict[str, Any]:
+        # Every benchmark gets a fresh database file, so that they don't affect one another.
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "benchmark.db"
+            db = Database(f"sqlite:///{path}", default=True)
+            try:
+                await Model.create_tables()
+                context = await self.setup(db) if self.setup else None
+                timings: list[float] = []
+                with db.audit(_ignore_event) if self.audit else nullcontext():
+                    for n in range(warmup + repeat):
+                        start = time.perf_counter()
+                        await self.operation(context)
+                        duration = time.perf_counter() - start
+                        if n >= warmup:
+                            timings.append(duration)
+            finally:
+                await db.stop()
+        mean = statistics.mean(timings)
+        return {
+            "name": self.name,
+            "description": self.description,
+            "repeat": repeat,
+            "operations": self.operations,
+            "mean": mean,
+            "median": statistics.median(timings),
+            "min": min(timings),
+            "max": max(timings),
+            "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "operations_per_second": self.operations / mean if mean else None,
+        }
+
+
+def _ignore_event(_: Any) -> None:
+    pass
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any
+
+from tunqi import FK, M2M, Backref, Index, Model
+
+
+class Author(Model):
+    name: Index[str]
+    age: int
+    books: Backref[Book]
+
+
+class Book(Model):
+    title: str
+    published: dt.datetime
+    pages: int
+    rating: float
+    tags: list[str]
+    metadata: dict[str, Any]
+    author: FK[Author]
+    genres: M2M[Genre]
+
+
+class Genre(Model):
+    name: str
+    books: M2M[Book]
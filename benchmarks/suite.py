@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any
+
+from tunqi import Database, Query, param
+
+from .benchmark import Benchmark
+from .models import Author, Book, Genre
+
+AUTHORS = 100
+BOOKS_PER_AUTHOR = 20
+GENRES = 10
+BATCH = 1000
+
+
+def make_book(n: int, author: Author | int) -> Book:
+    return Book(
+        title=f"book {n}",
+        published=dt.datetime(2000, 1, 1, tzinfo=dt.UTC) + dt.timedelta(days=n),
+        pages=100 + n % 500,
+        rating=n % 50 / 10,
+        tags=[f"tag {n % 7}", f"tag {n % 11}"],
+        metadata={"isbn": f"{n:013}", "edition": n % 3},
+        author=author,
+    )
+
+
+def make_row(n: int) -> dict[str, Any]:
+    return make_book(n, 1)._dump_values()
+
+
+async def library(db: Database) -> dict[str, Any]:
+    authors = [Author(name=f"author {n}", age=20 + n % 60) for n in range(AUTHORS)]
+    await Author.create(*authors)
+    books = [make_book(n, authors[n % AUTHORS]) for n in range(AUTHORS * BOOKS_PER_AUTHOR)]
+    await Book.create(*books)
+    genres = [Genre(name=f"genre {n}") for n in range(GENRES)]
+    await Genre.create(*genres)
+    for n, book in enumerate(books[:BATCH]):
+        await book.genres.add(genres[n % GENRES])
+    return {"db": db, "authors": authors, "books": books, "genres": genres}
+
+
+async def rows(db: Database) -> dict[str, Any]:
+    await author(db)
+    table = db.get_table("book")
+    await db.insert("book", *[make_row(n) for n in range(BATCH)])
+    # The rows are fetched as the driver returns them (before they're deserialized), so it's the real row path.
+    async with db.execute(table.table.select()) as cursor:
+        fetched = [dict(row._mapping) for row in cursor]
+    return {"db": db, "rows": [make_row(n) for n in range(BATCH)], "fetched": fetched, "table": table}
+
+
+@Benchmark.register("get", setup=library, operations=100)
+async def get(context: dict[str, Any]) -> None:
+    """Get a single book by PK (100 times)."""
+    for book in context["books"][:100]:
+        await Book.get(book.pk)
+
+
+@Benchmark.register("get_audited", setup=library, operations=100, audit=True)
+async def get_audited(context: dict[str, Any]) -> None:
+    """Get a single book by PK (100 times), with an auditor."""
+    await get(context)
+
+
+async def author(db: Database) -> Author:
+    author = Author(name="author", age=40)
+    await author.save()
+    return author
+
+
+async def prepared_library(db: Database) -> dict[str, Any]:
+    context = await library(db)
+    context["by_pk"] = Book.prepare(pk=param("pk"))
+    return context
+
+
+@Benchmark.register("get_prepared", setup=prepared_library, operations=100)
+async def get_prepared(context: dict[str, Any]) -> None:
+    """Get a single book by PK with a prepared query (100 times)."""
+    for book in context["books"][:100]:
+        await context["by_pk"].one(pk=book.pk)
+
+
+@Benchmark.register("page_load", setup=library, operations=6)
+async def page_load(context: dict[str, Any]) -> None:
+    """Run 6 independent queries one after the other."""
+    for author in context["authors"][:6]:
+        await Book.all(author__name=author.name)
+
+
+@Benchmark.register("page_load_gathered", setup=library, operations=6)
+async def page_load_gathered(context: dict[str, Any]) -> None:
+    """Run 6 independent queries concurrently, each on its own connection."""
+    await context["db"].gather(*(Book.all(author__name=author.name) for author in context["authors"][:6]))
+
+
+@Benchmark.register("counts", setup=library, operations=20)
+async def counts(context: dict[str, Any]) -> None:
+    """Count the books of 20 authors, one query at a time."""
+    for author in context["authors"][:20]:
+        await context["db"].count("book", author=author.pk)
+
+
+@Benchmark.register("counts_batched", setup=library, operations=20)
+async def counts_batched(context: dict[str, Any]) -> None:
+    """Count the books of 20 authors, in a single batch."""
+    async with context["db"].batch() as batch:
+        for author in context["authors"][:20]:
+            batch.count("book", author=author.pk)
+
+
+@Benchmark.register("create", setup=author, operations=BATCH)
+async def create(author: Author) -> None:
+    """Create 1,000 books with a single call."""
+    await Book.create(*(make_book(n, author) for n in range(BATCH)))
+
+
+@Benchmark.register("all", setup=library, operations=AUTHORS * BOOKS_PER_AUTHOR)
+async def all(context: dict[str, Any]) -> None:
+    """Select and deserialize 2,000 books."""
+    await Book.all()
+
+
+@Benchmark.register("all_unvalidated", setup=library, operations=AUTHORS * BOOKS_PER_AUTHOR)
+async def all_unvalidated(context: dict[str, Any]) -> None:
+    """Select and deserialize 2,000 books, without validating them."""
+    await Book.all(validate=False)
+
+
+@Benchmark.register("all_audited", setup=library, operations=AUTHORS * BOOKS_PER_AUTHOR, audit=True)
+async def all_audited(context: dict[str, Any]) -> None:
+    """Select and deserialize 2,000 books, with an auditor."""
+    await Book.all()
+
+
+@Benchmark.register("select", setup=library, operations=AUTHORS * BOOKS_PER_AUTHOR)
+async def select(context: dict[str, Any]) -> None:
+    """Select and deserialize 2,000 book rows, without loading them into models."""
+    await context["db"].select("book")
+
+
+@Benchmark.register("filter_join", setup=library, operations=AUTHORS)
+async def filter_join(context: dict[str, Any]) -> None:
+    """Select the books of each author by name, with a JOIN (100 times)."""
+    for author in context["authors"]:
+        await Book.all(author__name=author.name)
+
+
+@Benchmark.register("filter_backref", setup=library, operations=GENRES)
+async def filter_backref(context: dict[str, Any]) -> None:
+    """Select the authors of each genre's books, with a JOIN through a many-to-many relation (10 times)."""
+    for genre in context["genres"]:
+        await Author.all(books__genres__name=genre.name)
+
+
+@Benchmark.register("link_unlink", setup=library, operations=200)
+async def link_unlink(context: dict[str, Any]) -> None:
+    """Link and unlink 100 books to all genres."""
+    for book in context["books"][-100:]:
+        await book.genres.add(*context["genres"])
+        await book.genres.remove(*context["genres"])
+
+
+@Benchmark.register("query_resolve", setup=rows, operations=BATCH)
+async def query_resolve(context: dict[str, Any]) -> None:
+    """Resolve a query with a JOIN into a SQLAlchemy clause (1,000 times)."""
+    for n in range(BATCH):
+        query = Query({"title__startswith": "book", "rating__gt": n % 5, "author__name": f"author {n}"})
+        query.resolve(context["table"])
+
+
+@Benchmark.register("serialize", setup=rows, operations=BATCH)
+async def serialize(context: dict[str, Any]) -> None:
+    """Serialize 1,000 rows."""
+    context["db"].serialize(context["rows"])
+
+
+@Benchmark.register("deserialize", setup=rows, operations=BATCH)
+async def deserialize(context: dict[str, Any]) -> None:
+    """Deserialize 1,000 rows."""
+    db: Database = context["db"]
+    for row in context["fetched"]:
+        db.deserialize(row)
@@ -65,7 +65,7 @@ def lint(args: list[str]) -> None:
             raise FileNotFoundError(f"{path} does not exist")
         paths.append(path)
     if not paths:
-        paths.extend([ROOT / PACKAGE, ROOT / "tests"])
+        paths.extend([ROOT / PACKAGE, ROOT / "tests", ROOT / "benchmarks"])
     for path in paths:
         _execute("black", f"--line-length={LINE_LENGTH}", path)
         _execute("isort", "--profile=black", path)
@@ -83,9 +83,15 @@ def type(args: list[str]) -> None:
     _execute("mypy", *packages)
 
 
+@main.command()
+@click.argument("args", nargs=-1)
+def bench(args: list[str]) -> None:
+    _execute("python", "-m", "benchmarks", *args)
+
+
 @main.command()
 def sync() -> None:
-    filenames = ["database.py", "model.py", "model_type.py", "fk.py", "backref.py", "m2m.py"]
+    filenames = ["database.py", "prepared.py", "batch.py", "model.py", "model_type.py", "fk.py", "backref.py", "m2m.py"]
     async_paths: list[pathlib.Path] = []
     for path in (ROOT / PACKAGE).rglob("*.py"):
         if path.name in filenames and path.parent.name != "sync":
@@ -132,11 +138,14 @@ def _async_to_sync(text: str, async_paths: list[pathlib.Path]) -> str:
     text = text.replace("aiomysql", "pymysql")
     text = text.replace("asyncmy", "mariadbconnector")
     # Change async engine quirks to standard usage.
-    text = text.replace("self.engine.sync_engine", "self.engine")
+    text = re.sub(r"\.sync_engine\b", "", text)
+    text = text.replace("connection.stream(", "connection.execute(")
+    text = text.replace("await connection.get_raw_connection()", "connection.connection")
     text = re.sub(
-        r"async with (.*?)\.begin\(\) as connection:\n\s*"
-        r"await connection\.run_sync\(self\.metadata(.*?)(, .*?)?\)",
-    r"self.metadata\2(\1\3)", text)
+        r"async with (.*?)\.begin\(\) as connection:\n\s*" r"await connection\.run_sync\(self\.metadata(.*?)(, .*?)?\)",
+        r"self.metadata\2(\1\3)",
+        text,
+    )
     text = re.sub(r"connection\.run_sync\(migration(.*?)\)", r"migration\1(connection)", text)
     # Remove pytest_asyncio import and replace references to it with pytest.
     if "import pytest\n" in text:
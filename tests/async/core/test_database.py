@@ -1,9 +1,13 @@
 import base64
 import datetime as dt
+import inspect
+import pathlib
+from typing import Any
 
 import pytest
+from sqlalchemy.exc import TimeoutError
 
-from tunqi import Database
+from tunqi import AuditEvent, Database, DoesNotExistError
 
 pytestmark = pytest.mark.asyncio
 
@@ -71,6 +75,105 @@ async def test_active_database(db_url: str) -> None:
     await db3.stop()
 
 
+async def test_pool(db_url: str) -> None:
+    db = Database(db_url, pool_size=1, max_overflow=1, pool_timeout=0.1, pool_recycle=3600, pool_pre_ping=True)
+    stats = db.pool_stats()
+    assert stats["size"] == 1
+    assert (stats["checked_out"], stats["overflow"], stats["checkouts"], stats["mean_wait_time"]) == (0, 0, 0, None)
+    events: list[AuditEvent] = []
+    with db.audit(events.append):
+        async with db.connection():
+            # Nested calls reuse the same connection, so we check out another one directly.
+            async with db.connection(), db._checkout(db.engine):
+                stats = db.pool_stats()
+                assert (stats["checked_out"], stats["overflow"], stats["checkouts"]) == (2, 1, 2)
+                with pytest.raises(TimeoutError, match="QueuePool limit of size 1 overflow 1 reached"):
+                    async with db._checkout(db.engine):
+                        pass
+    stats = db.pool_stats()
+    assert (stats["checked_out"], stats["idle"], stats["checkouts"]) == (0, 1, 2)
+    assert stats["max_wait_time"] <= stats["wait_time"]
+    assert stats["mean_wait_time"] == stats["wait_time"] / 2
+    [connect] = events
+    [first_checkout, second_checkout, failed_checkout] = connect.children
+    assert first_checkout.name == second_checkout.name == failed_checkout.name == "checkout"
+    assert (first_checkout.data["checked_out"], first_checkout.data["overflow"]) == (1, 0)
+    assert (second_checkout.data["checked_out"], second_checkout.data["overflow"]) == (2, 1)
+    assert isinstance(failed_checkout.error, TimeoutError)
+    await db.stop()
+
+
+async def test_gather(db: Database, u: dict[str, Any]) -> None:
+    db.add_table("u", u)
+    await db.create_tables()
+    await db.insert("u", {"s": "a", "n": 1}, {"s": "b", "n": 2})
+    assert await db.gather() == []
+    # Inside a connection, the operations check out connections of their own.
+    async with db.connection():
+        results = await db.gather(db.count("u"), db.select("u", "s", n=2), db.exists("u", s="c"), max_concurrency=2)
+        assert results == [2, [{"s": "b"}], False]
+    assert db.pool_stats()["checked_out"] == 0
+    # Inside a transaction, they share its connection, so its changes are visible.
+    async with db.transaction():
+        await db.insert("u", {"s": "c", "n": 3})
+        assert await db.gather(db.count("u"), db.exists("u", s="c")) == [3, True]
+    with pytest.raises(DoesNotExistError, match="u with n == 4 doesn't exist"):
+        await db.gather(db.select_one("u", n=4), db.count("u"))
+    assert db.pool_stats()["checked_out"] == 0
+    # If one of them fails in a transaction, the rest are closed rather than left unawaited.
+    async with db.transaction():
+        count = db.count("u")
+        with pytest.raises(DoesNotExistError, match="u with n == 4 doesn't exist"):
+            await db.gather(db.select_one("u", n=4), count)
+    if inspect.iscoroutine(count):
+        assert inspect.getcoroutinestate(count) == inspect.CORO_CLOSED
+    with pytest.raises(ValueError, match="invalid max concurrency 0"):
+        await db.gather(max_concurrency=0)
+
+
+async def test_replicas(db_url: str, tmp_path: pathlib.Path, u: dict[str, Any]) -> None:
+    if not db_url.startswith("sqlite"):
+        pytest.skip("SQLite-only test")
+    # Each SQLite "replica" is a separate file, so we can tell where a query was routed by its results.
+    replica_urls = [f"sqlite:///{tmp_path / f'replica{n}.db'}" for n in range(2)]
+    for name, url in zip(["primary", "replica0", "replica1"], [db_url, *replica_urls]):
+        database = Database(url)
+        database.add_table("u", u)
+        await database.create_tables()
+        await database.insert("u", {"s": name})
+        await database.stop()
+    db = Database(db_url, replicas=replica_urls)
+    db.add_table("u", u)
+    assert [await db.select_one("u", "s") for _ in range(3)] == [
+        {"s": "replica0"},
+        {"s": "replica1"},
+        {"s": "replica0"},
+    ]
+    assert await db.count("u") == 1
+    assert await db.exists("u", s="replica0")
+    assert await db.select("u", "s") == [{"s": "replica1"}]
+    # Each replica's pool is reported separately, so the primary's stats only cover its own checkouts.
+    stats = db.pool_stats()
+    assert (stats["checked_out"], stats["checkouts"]) == (0, 0)
+    assert [(replica["checked_out"], replica["checkouts"]) for replica in stats["replicas"]] == [(0, 3), (0, 3)]
+    # Writes and transactions stay on the primary.
+    await db.insert("u", {"s": "new"})
+    async with db.transaction():
+        assert await db.select("u", "s", order="pk") == [{"s": "primary"}, {"s": "new"}]
+    with db.primary():
+        assert await db.count("u") == 2
+    assert await db.count("u") == 1
+    await db.stop()
+    db = Database(db_url, replicas=replica_urls, replica_routing="least_busy")
+    db.add_table("u", u)
+    assert await db.select("u", "s") == [{"s": "replica0"}]
+    await db.stop()
+    with pytest.raises(ValueError, match=r"invalid replica routing 'random' \(available routings are round_robin and"):
+        Database(db_url, replicas=replica_urls, replica_routing="random")
+    with pytest.raises(ValueError, match="replica 'postgresql://localhost/test' doesn't use the same dialect as"):
+        Database(db_url, replicas=["postgresql://localhost/test"])
+
+
 async def test_invalid_dialect() -> None:
     with pytest.raises(
         RuntimeError,
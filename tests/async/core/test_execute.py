@@ -1,6 +1,10 @@
+import logging
+from typing import Any, Iterator
+
 import pytest
 
-from tunqi import Database
+from tunqi import AuditEvent, Database, Row
+from tunqi.audit import Lazy
 
 pytestmark = pytest.mark.asyncio
 
@@ -23,3 +27,111 @@ async def test_execute(db: Database) -> None:
         statement = "SELECT :foo || :bar"
     async with db.execute(statement, values) as cursor:
         assert cursor.scalar() == "foobar"
+
+
+async def test_execute_many(db: Database) -> None:
+    async with db.execute("CREATE TABLE a (n INTEGER)", autocommit=True):
+        pass
+    try:
+        events: list[AuditEvent] = []
+        with db.audit(events.append):
+            count = await db.execute_many("INSERT INTO a (n) VALUES (:n)", ({"n": n} for n in range(10)), chunk_size=4)
+        # Some drivers don't report the rowcount of executemany.
+        assert count == 10 or count == -1 and db.is_postgresql
+        [execute_many] = events
+        assert execute_many.data["rows"] == count
+        assert len(execute_many.data["chunks"]) == 3
+        async with db.execute("SELECT COUNT(*), SUM(n) FROM a") as cursor:
+            assert tuple(cursor.one()) == (10, 45)
+        count = await db.execute_many("UPDATE a SET n = :m WHERE n = :n", [{"n": 1, "m": 10}, {"n": 2, "m": 20}])
+        assert count == 2 or count == -1 and db.is_postgresql
+
+        # The chunks are written all or nothing.
+        def rows() -> Iterator[dict[str, Any]]:
+            yield {"n": 100}
+            raise ValueError("foo")
+
+        with pytest.raises(ValueError, match="foo"):
+            await db.execute_many("INSERT INTO a (n) VALUES (:n)", rows(), chunk_size=1)
+        async with db.execute("SELECT COUNT(*) FROM a") as cursor:
+            assert cursor.scalar() == 10
+        assert await db.execute_many("INSERT INTO a (n) VALUES (:n)", []) == 0
+        with pytest.raises(ValueError, match="invalid chunk size 0"):
+            await db.execute_many("INSERT INTO a (n) VALUES (:n)", [], chunk_size=0)
+    finally:
+        async with db.execute("DROP TABLE a", autocommit=True):
+            pass
+
+
+async def test_execute_audit(db: Database) -> None:
+    events: list[AuditEvent] = []
+    with db.audit(events.append):
+        async with db.execute("SELECT :n", {"n": 1}):
+            pass
+    [connect] = events
+    [checkout, execute] = connect.children
+    assert checkout.name == "checkout"
+    # The statement is only formatted once it's read.
+    assert isinstance(dict.__getitem__(execute.data, "statement"), Lazy)
+    assert execute.data["statement"] == "SELECT 1"
+    assert isinstance(dict.__getitem__(execute.data, "statement"), str)
+    events.clear()
+    with db.audit(events.append):
+        for _ in range(2):
+            async with db.execute("SELECT :n", {"n": 1}):
+                pass
+    # Lazy values don't leak when the data is copied into a plain dict either.
+    executes = [connect.children[1] for connect in events]
+    assert dict(executes[0].data)["statement"] == "SELECT 1"
+    assert {**executes[1].data}["statement"] == "SELECT 1"
+    events.clear()
+    db.audit_sampling = 3
+    try:
+        with db.audit(events.append):
+            for n in range(6):
+                async with db.execute("SELECT :n", {"n": n}):
+                    pass
+    finally:
+        db.audit_sampling = 1
+    assert len(events) == 2
+    with pytest.raises(ValueError, match="invalid audit sampling 0"):
+        Database(db.url, audit_sampling=0)
+
+
+async def test_slow_query(db: Database, u: dict[str, Any], caplog: pytest.LogCaptureFixture) -> None:
+    db.add_table("u", u)
+    await db.create_tables()
+    await db.insert("u", {"s": "a", "n": 1, "b": True})
+    async with db.transaction():
+        await db.insert("u", {"s": "b", "n": 2, "b": False})
+        # The plan is fetched without disturbing the transaction.
+        db.slow_query_threshold = 0
+        try:
+            with caplog.at_level(logging.WARNING, logger="tunqi"):
+                assert await db.select("u", "s", n__gt=0, order="pk") == [{"s": "a"}, {"s": "b"}]
+        finally:
+            db.slow_query_threshold = None
+    assert await db.count("u") == 2
+    [record] = caplog.records
+    assert record.operation == "connect > begin > select(u) > execute"  # type: ignore
+    assert list(record.parameters.values()) == [0]  # type: ignore
+    assert "u" in record.plan  # type: ignore
+    message = record.getMessage()
+    assert message.startswith("slow query (")
+    assert "in connect > begin > select(u) > execute" in message
+    assert "plan:\n" in message
+
+
+async def test_slow_query_plan(db: Database, rs: list[Row], caplog: pytest.LogCaptureFixture) -> None:
+    db.slow_query_threshold = 0
+    try:
+        with caplog.at_level(logging.WARNING, logger="tunqi"):
+            # The plan is fetched for the statement as it was executed, with expanded IN lists and serialized JSON.
+            await db.insert("t", *rs)
+            assert await db.count("t", n__in=[1, 2, 3]) == 3
+    finally:
+        db.slow_query_threshold = None
+    assert len(caplog.records) == 2
+    for record in caplog.records:
+        assert record.plan and "<unavailable" not in record.plan  # type: ignore
+    assert list(caplog.records[1].parameters.values())[-3:] == [1, 2, 3]  # type: ignore
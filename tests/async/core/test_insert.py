@@ -1,8 +1,9 @@
+import datetime as dt
 from typing import Any
 
 import pytest
 
-from tunqi import AlreadyExistsError, Database, Row
+from tunqi import AlreadyExistsError, AuditEvent, Database, Row
 
 pytestmark = pytest.mark.asyncio
 
@@ -20,6 +21,16 @@ async def test_insert_many(db: Database, r1: Row, r2: Row) -> None:
     assert r2_pk == 2
 
 
+async def test_insert_many_pks(db: Database, rs: list[Row]) -> None:
+    pks = await db.insert("t", *rs[:3])
+    assert pks == [1, 2, 3]
+    await db.delete("t", pk__in=pks[:2])
+    pks = await db.insert("t", *rs)
+    assert pks == list(range(4, 14))
+    rows = await db.select("t", ["pk", "n"], order="pk")
+    assert rows[1:] == [{"pk": pk, "n": r["n"]} for pk, r in zip(pks, rs)]
+
+
 async def test_insert_many_without_pks(db: Database, r1: Row, r2: Row) -> None:
     assert await db.insert("t", r1, r2, return_pks=False) == []
     r1a, r2b = await db.select("t")
@@ -69,3 +80,45 @@ async def test_unique_together(db: Database, u2: dict[str, Any]) -> None:
         await db.insert("u", {"n1": 1, "n2": 2, "s1": "d", "s2": "e"})
     with pytest.raises(AlreadyExistsError, match="u with s1 'b' and s2 'c' already exists"):
         await db.insert("u", {"n1": 3, "n2": 4, "s1": "b", "s2": "c"})
+
+
+async def test_insert_chunks(db: Database, u: dict[str, Any]) -> None:
+    db.add_table("u", u)
+    await db.create_tables()
+    rows = [{"s": f"s{n}", "n": n, "b": True} for n in range(10)]
+    events: list[AuditEvent] = []
+    with db.audit(events.append):
+        pks = await db.insert("u", *rows, chunk_size=4)
+    assert pks == list(range(1, 11))
+    names: list[str] = []
+    while events:
+        event = events.pop(0)
+        names.append(event.name)
+        events.extend(event.children)
+    assert names.count("execute") == 3
+    assert names.count("begin") == 1
+    assert await db.select("u", "n", order="pk") == [{"n": n} for n in range(10)]
+    rows = [{"s": f"t{n}", "n": n, "b": True} for n in range(10)] + [{"s": "s0", "n": 10, "b": True}]
+    with pytest.raises(AlreadyExistsError, match="u with s in .* already exists"):
+        await db.insert("u", *rows, chunk_size=4)
+    assert await db.count("u") == 10
+    # Without a chunk size, the rows are chunked by the database's limit on the number of parameters.
+    rows = [{"s": f"t{n}", "n": n, "b": True} for n in range(10_000)]
+    pks = await db.insert("u", *rows)
+    assert pks == list(range(pks[0], pks[0] + 10_000))
+    assert await db.count("u") == 10_010
+    for chunk_size in [0, -1]:
+        with pytest.raises(ValueError, match=f"invalid chunk size {chunk_size}"):
+            await db.insert("u", *rows, chunk_size=chunk_size)
+    assert await db.count("u") == 10_010
+
+
+async def test_copy_insert(db: Database, rs: list[Row]) -> None:
+    now = dt.datetime.now().astimezone()
+    for n, r in enumerate(rs):
+        r.update(s=f"a\tb\nc\\{n}", o=None if n % 2 else "o", dt=now, bs=bytes([n, 255]), ns=[n], f={"s": None})
+    rows = (r for r in rs)
+    assert await db.copy_insert("t", rows, chunk_size=3) == 10
+    assert [{k: v for k, v in row.items() if k != "pk"} for row in await db.select("t", order="pk")] == rs
+    assert await db.copy_insert("t", []) == 0
+    assert await db.count("t") == 10
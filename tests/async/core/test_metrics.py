@@ -0,0 +1,44 @@
+from typing import Any
+
+import pytest
+
+from tunqi import Database, Metrics
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_metrics(db: Database, u: dict[str, Any]) -> None:
+    db.add_table("u", u)
+    await db.create_tables()
+    metrics = Metrics()
+    with db.audit(metrics):
+        await db.insert("u", *[{"s": f"s{n}", "n": n, "b": True} for n in range(3)])
+        await db.select("u")
+        await db.select("u", n__gt=0)
+        async with db.transaction():
+            await db.update("u", n=0)(b=False)
+        with pytest.raises(ValueError):
+            await db.bulk_update("u", {"n": 1})
+    snapshot = metrics.snapshot()
+    operations = {(operation["operation"], operation["table"]): operation for operation in snapshot["operations"]}
+    assert operations["insert", "u"]["count"] == 1
+    assert operations["insert", "u"]["rows"] == 3
+    assert operations["select", "u"]["count"] == 2
+    assert operations["select", "u"]["rows"] == 5
+    assert operations["updating", "u"]["rows"] == 1
+    assert operations["bulk_update", "u"]["errors"] == 1
+    assert operations["execute", None]["count"] == 4
+    assert 0 < operations["select", "u"]["min"] <= operations["select", "u"]["p50"] <= operations["select", "u"]["max"]
+    assert snapshot["checkouts"]["count"] == 4
+    assert snapshot["transactions"]["count"] == 1
+    prometheus = metrics.to_prometheus()
+    assert "# TYPE tunqi_operation_duration_seconds histogram" in prometheus
+    assert 'tunqi_operation_duration_seconds_count{operation="select",table="u"} 2' in prometheus
+    assert 'tunqi_operation_duration_seconds_bucket{operation="select",table="u",le="+Inf"} 2' in prometheus
+    assert 'tunqi_operation_rows_total{operation="insert",table="u"} 3' in prometheus
+    assert 'tunqi_operation_errors_total{operation="bulk_update",table="u"} 1' in prometheus
+    assert "tunqi_transaction_duration_seconds_count 1" in prometheus
+    metrics.reset()
+    snapshot = metrics.snapshot()
+    assert snapshot["operations"] == []
+    assert snapshot["checkouts"]["count"] == snapshot["transactions"]["count"] == 0
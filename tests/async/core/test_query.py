@@ -96,6 +96,27 @@ async def test_query_join(db: Database) -> None:
     assert await fields(db.select("x", "s", where=q(ys__gt=1))) == {"b", "c"}
 
 
+async def test_selector_cache(db: Database) -> None:
+    db.add_table("x", {"columns": {"s": {"type": "string"}}})
+    db.add_table("y", {"columns": {"x": {"type": "fk", "table": "x"}, "d": {"type": "json"}}})
+    table = db.get_table("y")
+    [selector] = Selector.create(table, "-x.s:name")
+    assert table._selector_cache["-x.s:name"][0] is not selector
+    # The cached selectors are copied, so changing them (or their joins) doesn't affect later resolutions.
+    selector.alias = "other"
+    selector.joins[table].clear()
+    [selector] = Selector.create(table, "-x.s:name")
+    assert (selector.alias, selector.desc, selector.joins) == ("name", True, {table: [db.get_table("x")]})
+    [selector] = Selector.create(table, "d.a")
+    selector.json_as(int)
+    [selector] = Selector.create(table, "d.a")
+    assert selector.json_path == "a"
+    assert str(selector.clause) == str(table.table.c.d["a"])
+    with pytest.raises(ValueError, match="table 'y' has no column 'z'"):
+        Selector.create(table, "z")
+    assert "z" not in table._selector_cache
+
+
 async def test_custom_operator(db: Database) -> None:
     @function("->", name="next")
     def next_(selector: Selector, value: Any) -> ColumnElement:
@@ -198,3 +198,14 @@ async def test_unique_together() -> None:
         await u3.save()
     with pytest.raises(AlreadyExistsError, match="u with s1 'b' and s2 'c' already exists"):
         await u4.save()
+
+
+async def test_bulk_load(ts: list[T]) -> None:
+    assert await T.bulk_load(t for t in ts) == 10
+    assert all(t.pk is None for t in ts)
+    assert [t.model_dump(exclude={"pk"}) for t in await T.all(order=["pk"])] == [
+        t.model_dump(exclude={"pk"}) for t in ts
+    ]
+    t = await T.get(pk=1)
+    with pytest.raises(ValueError, match=re.escape(f"{t} (item #1) already exists")):
+        await T.bulk_load([t])
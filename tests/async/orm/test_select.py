@@ -3,9 +3,9 @@ from typing import Any
 
 import pytest
 
-from tunqi import DoesNotExistError, Model
+from tunqi import FK, Database, DoesNotExistError, MemoryCache, Model, c, param
 
-from .conftest import T
+from .conftest import F, T
 
 pytestmark = pytest.mark.asyncio
 
@@ -37,6 +37,13 @@ async def test_select_with_query(t2: T, condition: tuple[str, Any, bool]) -> Non
     assert await T.all(**{key: value}) == ([t2] if expected else [])
 
 
+async def test_select_columns(ts: list[T]) -> None:
+    await T.create(*ts)
+    columns = await T.all_columns(["n", "b"], order="-n", limit=3, arrays=False)
+    assert columns == {"n": [9, 8, 7], "b": [False, True, False]}
+    assert await T.all_columns("n", b=True, arrays=False) == {"n": [0, 2, 4, 6, 8]}
+
+
 async def test_select_with_range(ts: list[T]) -> None:
     await T.create(*ts)
     assert await T.all(limit=5) == ts[:5]
@@ -121,3 +128,165 @@ async def test_select_invalid() -> None:
         await U.get(s__x=1)
     with pytest.raises(ValueError, match=re.escape(error)):
         await U.all(order="s.x")
+
+
+async def test_stream(ts: list[T]) -> None:
+    assert [t async for t in T.stream()] == []
+    await T.create(*ts)
+    assert [t async for t in T.stream(batch_size=3)] == ts
+    assert [t async for t in T.stream(order="-n", batch_size=4)] == ts[::-1]
+    assert [t async for t in T.stream(b=True)] == ts[::2]
+    assert [t async for t in T.stream(limit=5, offset=3)] == ts[3:8]
+
+
+async def test_page(ts: list[T]) -> None:
+    assert await T.page() == ([], None)
+    await T.create(*ts)
+    page, cursor = await T.page(order=["-n"], size=6)
+    assert page == ts[::-1][:6]
+    assert await T.page(order=["-n"], size=6, cursor=cursor) == (ts[::-1][6:], None)
+
+
+async def test_select_without_validation(t2: T, ts: list[T]) -> None:
+    await T.create(*ts)
+    assert await T.all(order="pk", validate=False) == ts
+    assert await T.get(ts[0].pk, validate=False) == ts[0]
+    assert [t async for t in T.stream(validate=False)] == ts
+    assert await T.page(order=["-n"], size=20, validate=False) == (ts[::-1], None)
+    # JSON values are still validated (so nested models are parsed), and the state is tracked as usual.
+    await t2.save()
+    t = await T.get(t2.pk, validate=False)
+    assert t == t2
+    assert isinstance(t.f, F)
+    assert all(isinstance(f, F) for f in t.fs)
+    assert t.changed() == {}
+    t.ss.append("baz")
+    assert list(t.changed()) == ["ss"]
+
+
+async def test_select_without_validation_fks() -> None:
+
+    class A(Model):
+        s: str
+
+    class B(Model):
+        a: FK[A]
+
+    await Model.create_tables()
+    a = await A(s="a").save()
+    b = await B(a=a).save()
+    b2 = await B.get(b.pk, validate=False)
+    assert b2 == b
+    assert b2.a.pk == a.pk
+    assert await b2.a.get() == a
+
+
+async def test_prepare(db: Database) -> None:
+
+    class A(Model):
+        s: str
+
+    class B(Model):
+        a: FK[A]
+        n: int
+
+    await Model.create_tables()
+    a1, a2 = await A(s="a").save(), await A(s="b").save()
+    bs = [B(a=a1 if n % 2 else a2, n=n) for n in range(5)]
+    await B.create(*bs)
+    by_a = B.prepare(a__s=param("s"), order=["-n"], prefetch=["a"])
+    assert await by_a(s="a") == [bs[3], bs[1]]
+    assert await by_a(s="c") == []
+    by_n = B.prepare(n=param("n"), prefetch=["a"])
+    events: list[Any] = []
+    with db.audit(events.append):
+        [b] = await by_n(n=4)
+        assert await b.a.get() == a2
+        assert [(event.name, event.data.get("prepared")) for event in events] == [("select", True), ("select", None)]
+    by_n = B.prepare(n=param("n"), validate=False)
+    assert await by_n.one(n=2) == bs[2]
+    with pytest.raises(DoesNotExistError, match=re.escape("b with n == :n doesn't exist (n=5)")):
+        await by_n.one(n=5)
+
+
+async def test_cache(db: Database) -> None:
+    cache = MemoryCache(size=3)
+
+    class C(Model, cache=cache):
+        s: str
+        n: int
+
+    await C.create_tables()
+    c1, c2 = C(s="a", n=1), C(s="b", n=2)
+    await C.create(c1, c2)
+    assert (await C.get(c1.pk)).s == "a"
+    assert (await C.get(c1.pk)).s == "a"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [model.s for model in await C.all(order="pk")] == ["a", "b"]
+    assert [model.s for model in await C.all(order="pk")] == ["a", "b"]
+    assert (cache.hits, cache.misses) == (2, 2)
+    # Queries with expressions, and queries in transactions, are not cached.
+    assert [model.s for model in await C.all(where=c.n > 1)] == ["b"]
+    async with db.transaction():
+        assert (await C.get(c1.pk)).s == "a"
+    assert (cache.hits, cache.misses, len(cache)) == (2, 2, 2)
+    # Writes invalidate the cache, whether they're done through the model or the database.
+    c1.s = "c"
+    await c1.save()
+    assert len(cache) == 0
+    assert (await C.get(c1.pk)).s == "c"
+    await db.update("c", pk=c1.pk)(s="d")
+    assert (await C.get(c1.pk)).s == "d"
+    await c2.delete()
+    assert [model.s for model in await C.all(order="pk")] == ["d"]
+    await db.insert("c", {"s": "e", "n": 3})
+    assert [model.s for model in await C.all(order="pk")] == ["d", "e"]
+    # Results cached in a transaction are invalidated once it ends, even if it's rolled back.
+    with pytest.raises(RuntimeError):
+        async with db.transaction():
+            await C.create(C(s="f", n=4))
+            raise RuntimeError()
+    assert [model.s for model in await C.all(order="pk")] == ["d", "e"]
+    # The least recently used results are evicted.
+    await C.get(s="d")
+    await C.get(s="e")
+    await C.get(n=3)
+    assert len(cache) == 3
+    hits = cache.hits
+    await C.get(s="d")
+    await C.all(order="pk")
+    assert cache.hits == hits + 1
+    # And expired results are evicted as well.
+    cache.clear()
+    cache.ttl = 0
+    await C.get(s="d")
+    await C.get(s="d")
+    assert (len(cache), cache.hits, cache.misses) == (1, 0, 2)
+
+
+async def test_cache_with_relations(db: Database) -> None:
+    cache = MemoryCache()
+
+    class A(Model, cache=cache):
+        s: str
+
+    class B(Model, cache=cache):
+        a: FK[A]
+        n: int
+
+    await Model.create_tables()
+    a1, a2 = await A(s="a").save(), await A(s="b").save()
+    await B.create(B(a=a1, n=1), B(a=a2, n=2))
+    # Queries that filter or order by related tables aren't cached, since writes to them don't invalidate the results.
+    assert [b.n for b in await B.all(a__s="a")] == [1]
+    assert [b.n for b in await B.all(order=["-a.s"])] == [2, 1]
+    assert len(cache) == 0
+    a1.s = "c"
+    await a1.save()
+    assert await B.all(a__s="a") == []
+    assert [b.n for b in await B.all(order=["-a.s"])] == [1, 2]
+    # Writes to a table also invalidate the tables that reference it, since deletes might cascade to them.
+    assert [b.n for b in await B.all(order="n")] == [1, 2]
+    assert len(cache) == 1
+    await a1.delete()
+    assert [b.n for b in await B.all(order="n")] == [2]
@@ -1,9 +1,11 @@
+import datetime as dt
 import re
 from typing import Any
 
 import pytest
+from srlz import Serialization
 
-from tunqi.sync import Database, DoesNotExistError, Row
+from tunqi.sync import Database, DoesNotExistError, Row, param, q
 
 
 def test_select_one(db: Database, r1: Row, r2: Row) -> None:
@@ -25,6 +27,35 @@ def test_select(db: Database, r1: Row, r2: Row) -> None:
     assert db.select("t") == []
 
 
+def test_select_columns(db: Database, r1: Row, r2: Row) -> None:
+    assert db.select_columns("t", ["n", "s"], arrays=False) == {"n": [], "s": []}
+    r1["pk"], r2["pk"] = db.insert("t", r1, r2)
+    columns = db.select_columns("t", arrays=False)
+    assert columns == {key: [r1[key], r2[key]] for key in r1}
+    assert db.select_columns("t", ["n", "ss"], n=1, arrays=False) == {"n": [1], "ss": [r2["ss"]]}
+
+
+def test_select_columns_as_arrays(db: Database, r1: Row, r2: Row) -> None:
+    numpy = pytest.importorskip("numpy")
+    r1["pk"], r2["pk"] = db.insert("t", r1, r2)
+    columns = db.select_columns("t", order="n")
+    assert columns["b"].dtype == numpy.bool_
+    assert columns["b"].tolist() == [False, True]
+    assert columns["n"].dtype == numpy.int64
+    assert columns["n"].tolist() == [0, 1]
+    assert columns["x"].dtype == numpy.float64
+    assert columns["x"].tolist() == [0.0, 1.0]
+    # Datetimes are kept in UTC, and nulls become NaT (or NaN, for floats).
+    assert columns["dt"].dtype == numpy.dtype("datetime64[us]")
+    assert numpy.isnat(columns["dt"][0])
+    assert columns["dt"][1] == numpy.datetime64(r2["dt"].astimezone(dt.UTC).replace(tzinfo=None), "us")
+    # Other columns are object arrays.
+    assert columns["s"].dtype == object
+    assert columns["s"].tolist() == ["", "foo"]
+    assert columns["ss"].tolist() == [[], ["foo", "bar"]]
+    assert columns["o"].tolist() == [None, None]
+
+
 def test_select_with_query(db: Database, r2: Row, condition: tuple[str, Any, bool]) -> None:
     key, value, expected = condition
     assert db.select("t", **{key: value}) == []
@@ -96,6 +127,35 @@ def test_select_function(db: Database, r2: Row) -> None:
     assert db.select_one("t", "d.s.binary") == {"d.s.binary": b"foo"}
 
 
+def test_select_deserialization(db: Database, r1: Row, r2: Row, monkeypatch: pytest.MonkeyPatch) -> None:
+    r2["s"] = "bar"
+    r1["pk"], r2["pk"] = db.insert("t", r1, r2)
+    calls: list[Any] = []
+
+    class RecordingSerialization(Serialization):
+        def deserialize(self, data: Any) -> Any:
+            calls.append(data)
+            return Database.default_serialization.deserialize(data)
+
+    monkeypatch.setattr(db, "serialization", RecordingSerialization())
+    # Only the values of JSON columns go through the serialization (except nulls); scalars are returned as they are, and
+    # datetimes are converted to local time directly.
+    assert db.select("t", order="pk") == [r1, r2]
+    assert len(calls) == 9
+    assert "bar" not in calls
+    assert not any(isinstance(value, (int, float, bytes, dt.datetime)) for value in calls)
+    # The same goes for the other ways of selecting rows.
+    calls.clear()
+    assert db.select_one("t", pk=r2["pk"]) == r2
+    assert [row for row in db.stream_select("t", order="pk")] == [r1, r2]
+    assert db.select_page("t", order="pk") == ([r1, r2], None)
+    assert len(calls) == 5 + 9 + 9
+    # Columns of unknown types (like some function calls) are still checked by value.
+    calls.clear()
+    assert db.select_one("t", ["s.length", "d.dt"], pk=r2["pk"]) == {"s.length": 3, "d.dt": r2["dt"]}
+    assert 3 in calls
+
+
 def test_select_invalid(db: Database, u: dict[str, Any]) -> None:
     db.add_table("u", u)
     error = "table 'u' has no column 'x' (available selectors are pk, s, n and b)"
@@ -115,3 +175,212 @@ def test_select_invalid(db: Database, u: dict[str, Any]) -> None:
         db.select_one("u", s__x=1)
     with pytest.raises(ValueError, match=re.escape(error)):
         db.select("u", order="s.x")
+
+
+def test_select_statement_cache(db: Database, rs: list[Row]) -> None:
+    pks = db.insert("t", *rs)
+    for r, pk in zip(rs, pks):
+        r["pk"] = pk
+    db.statement_cache.clear()
+    assert db.select("t", n__lt=5, order="-n", limit=2) == [rs[4], rs[3]]
+    assert (db.statement_cache.hits, db.statement_cache.misses) == (0, 1)
+    assert db.select("t", n__lt=3, order="-n", limit=1) == [rs[2]]
+    assert db.select("t", n__lt=9, order="-n", limit=3, offset=1) == [rs[7], rs[6], rs[5]]
+    assert (db.statement_cache.hits, db.statement_cache.misses) == (1, 2)
+    assert db.select_one("t", pk=pks[1]) == rs[1]
+    assert db.select_one("t", pk=pks[2]) == rs[2]
+    assert db.count("t", n__in=[1, 2, 3]) == 3
+    assert db.count("t", n__in=[1, 2]) == 2
+    assert db.exists("t", s="")
+    assert not db.exists("t", s="foo")
+    assert (db.statement_cache.hits, db.statement_cache.misses) == (4, 5)
+    # Filters whose values affect the statement's shape are not cached.
+    assert db.count("t", o=None) == 10
+    assert db.count("t", d__has="x") == 10
+    assert (db.statement_cache.hits, db.statement_cache.misses) == (4, 5)
+    with pytest.raises(DoesNotExistError, match="t with n == 10 doesn't exist"):
+        db.select_one("t", n=10)
+
+
+def test_select_statement_cache_eviction(db: Database, rs: list[Row]) -> None:
+    db.insert("t", *rs)
+    db.statement_cache.clear()
+    db.statement_cache.size = 2
+    assert db.count("t", n=1) == 1
+    assert db.count("t", s="") == 10
+    assert db.count("t", n=2) == 1
+    assert db.count("t", b=True) == 5
+    assert len(db.statement_cache) == 2
+    assert db.count("t", s="foo") == 0
+    assert (db.statement_cache.hits, db.statement_cache.misses) == (1, 4)
+
+
+def test_prepare(db: Database, rs: list[Row]) -> None:
+    pks = db.insert("t", *rs)
+    for r, pk in zip(rs, pks):
+        r["pk"] = pk
+    below = db.prepare("t", n__lt=param("n"), order="-n", limit=3)
+    assert str(below) == "prepared query of ts with n < :n"
+    assert below.parameters == ["n"]
+    assert below(n=5) == [rs[4], rs[3], rs[2]]
+    assert below(n=2) == [rs[1], rs[0]]
+    assert below(n=0) == []
+    assert db.prepare("t", "n", n__in=param("ns"))(ns=[1, 3]) == [{"n": 1}, {"n": 3}]
+    either = db.prepare("t", "n", where=q("or", n=param("n"), b=param("b")), s="")
+    assert either.parameters == ["n", "b"]
+    assert either(n=1, b=False) == [{"n": 1}, {"n": 3}, {"n": 5}, {"n": 7}, {"n": 9}]
+    # Prepared queries skip the statement cache, since their statement is already built.
+    db.statement_cache.clear()
+    assert below(n=1) == [rs[0]]
+    assert len(db.statement_cache) == 0
+    by_pk = db.prepare("t", pk=param("pk"))
+    assert by_pk.one(pk=pks[1]) == rs[1]
+    with pytest.raises(DoesNotExistError, match=re.escape("t with pk == :pk doesn't exist (pk=0)")):
+        by_pk.one(pk=0)
+    with pytest.raises(DoesNotExistError, match=re.escape("t with n > 9 doesn't exist")):
+        db.prepare("t", n__gt=9).one()
+    db.delete("t")
+    with pytest.raises(DoesNotExistError, match="no ts exist"):
+        db.prepare("t").one()
+    error = "invalid parameters pk and n for prepared query of ts with pk == :pk (expected parameters are pk)"
+    with pytest.raises(ValueError, match=re.escape(error)):
+        by_pk(pk=1, n=2)
+    with pytest.raises(ValueError, match=re.escape("can't use parameter 'x' in 'd.has' (has can't be parameterized)")):
+        db.prepare("t", d__has=param("x"))
+
+
+def test_batch(db: Database, r1: Row, r2: Row) -> None:
+    r1["pk"], r2["pk"] = db.insert("t", r1, r2)
+    events: list[Any] = []
+    with db.audit(events.append):
+        with db.batch() as batch:
+            count = batch.count("t")
+            count_b = batch.count("t", b=True)
+            distinct = batch.count("t", "o")
+            exists = batch.exists("t", s="foo")
+            not_exists = batch.exists("t", n=2)
+            row1 = batch.select_one("t", pk=r1["pk"])
+            row2 = batch.select_one("t", ["n", "d.x"], n=1)
+            missing = batch.select_one("t", n=2)
+            assert len(batch) == 8
+            assert str(count) == "batched query of ts (pending)"
+    # All the queries are executed in a single statement.
+    [event] = events
+    assert event.name == "batch"
+    assert event.data["queries"] == 8
+    assert str(count) == "batched query of ts (done)"
+    assert count.get() == 2
+    assert count_b.get() == 1
+    assert distinct.get() == 1
+    assert exists.get() is True
+    assert not_exists.get() is False
+    assert row1.get() == r1
+    assert row2.get() == {"n": 1, "d.x": r2["d"]["x"]}
+    with pytest.raises(DoesNotExistError, match=re.escape("t with n == 2 doesn't exist")):
+        missing.get()
+    # Results that are needed before the batch is over flush it early.
+    with db.batch() as batch:
+        count = batch.count("t")
+        assert count.get() == 2
+        assert len(batch) == 0
+        row = batch.select_one("t", n=1)
+    assert row.get() == r2
+    db.delete("t")
+    with db.batch() as batch:
+        missing = batch.select_one("t")
+    with pytest.raises(DoesNotExistError, match="no ts exist"):
+        missing.get()
+    # If the block fails, its pending queries are discarded.
+    events.clear()
+    with db.audit(events.append), pytest.raises(ZeroDivisionError):
+        with db.batch() as batch:
+            count = batch.count("t")
+            1 / 0
+    assert events == []
+    assert len(batch) == 0
+    with pytest.raises(RuntimeError, match="batched query of ts was discarded before it was executed"):
+        count.get()
+
+
+def test_batch_errors(db: Database, r1: Row, monkeypatch: pytest.MonkeyPatch) -> None:
+    db.insert("t", r1)
+
+    def fail(values: Any) -> Any:
+        raise ZeroDivisionError()
+
+    # If loading one query's result fails, get() raises its error, and the other queries are resolved regardless.
+    with db.batch() as batch:
+        count = batch.count("t")
+        broken = batch.select_one("t")
+        monkeypatch.setattr(broken, "_load", fail)
+        exists = batch.exists("t", n=r1["n"])
+    assert count.get() == 1
+    with pytest.raises(ZeroDivisionError):
+        broken.get()
+    assert exists.get() is True
+
+
+def test_select_page_with_nulls(db: Database, rs: list[Row]) -> None:
+    for r in rs:
+        r["o"] = None if r["n"] % 3 else str(r["n"] % 4)
+    db.insert("t", *rs)
+    # Wherever the dialect sorts nulls, paging through them yields the same rows as selecting them at once.
+    for order in ["o", "-o", ["o", "n"], ["-o", "-n"], ["o", "-n"], ["-b", "o"], ["o", "-b", "n"]]:
+        expected = db.select("t", order=order)
+        rows: list[Row] = []
+        page, cursor = db.select_page("t", order=order, size=3)
+        rows.extend(page)
+        while cursor is not None:
+            page, cursor = db.select_page("t", order=order, cursor=cursor, size=3)
+            rows.extend(page)
+        assert rows == expected
+
+
+def test_stream_select(db: Database, rs: list[Row]) -> None:
+    assert [row for row in db.stream_select("t")] == []
+    pks = db.insert("t", *rs)
+    for r, pk in zip(rs, pks):
+        r["pk"] = pk
+    assert [row for row in db.stream_select("t", batch_size=3)] == rs
+    assert [row for row in db.stream_select("t", order="-n", batch_size=4)] == rs[::-1]
+    assert [row for row in db.stream_select("t", "n", b=True)] == [{"n": n} for n in range(0, 10, 2)]
+    assert [row for row in db.stream_select("t", limit=5, offset=3, batch_size=2)] == rs[3:8]
+    # Queries issued while a stream is being consumed use their own connection.
+    for row in db.stream_select("t", batch_size=1):
+        assert db.select_one("t", pk=row["pk"]) == row
+    # Even inside a connection, the stream gets its own, unless there's a transaction.
+    with db.connection():
+        for row in db.stream_select("t", batch_size=1):
+            assert db.select_one("t", pk=row["pk"]) == row
+            assert db.pool_stats()["checked_out"] == 2
+    with db.transaction():
+        db.delete("t", n__ge=5)
+        assert [row for row in db.stream_select("t")] == rs[:5]
+
+
+def test_select_page(db: Database, rs: list[Row]) -> None:
+    assert db.select_page("t") == ([], None)
+    pks = db.insert("t", *rs)
+    for r, pk in zip(rs, pks):
+        r["pk"] = pk
+    for order, expected in [
+        (None, rs),
+        ("-n", rs[::-1]),
+        (["b", "-n"], rs[-1::-2] + rs[-2::-2]),
+        (["-b", "d.x"], rs[::2] + rs[1::2]),
+        ("s", rs),
+    ]:
+        page, cursor = db.select_page("t", order=order, size=4)
+        assert page == expected[:4]
+        page, cursor = db.select_page("t", order=order, cursor=cursor, size=4)
+        assert page == expected[4:8]
+        page, cursor = db.select_page("t", order=order, cursor=cursor, size=4)
+        assert page == expected[8:]
+        assert cursor is None
+    page, cursor = db.select_page("t", "n", b=True, order="-n", size=3)
+    assert page == [{"n": 8}, {"n": 6}, {"n": 4}]
+    assert db.select_page("t", "n", b=True, order="-n", size=3, cursor=cursor) == ([{"n": 2}, {"n": 0}], None)
+    with pytest.raises(ValueError, match="invalid cursor 'foo'"):
+        db.select_page("t", cursor="foo")
+    with pytest.raises(ValueError, match="doesn't match order"):
+        db.select_page("t", order="n", cursor=cursor)
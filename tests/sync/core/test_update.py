@@ -1,4 +1,9 @@
-from tunqi.sync import Database, Row
+import datetime as dt
+import sys
+
+import pytest
+
+from tunqi.sync import AuditEvent, Database, Row
 
 
 def test_update_one(db: Database, r1: Row) -> None:
@@ -28,3 +33,47 @@ def test_update_many(db: Database, r1: Row, r2: Row) -> None:
     assert not r1["b"]
     assert not r2["b"]
     assert db.update("t", b=True)(n=2) == 0
+
+
+def test_bulk_update(db: Database, rs: list[Row]) -> None:
+    pks = db.insert("t", *rs)
+    now = dt.datetime.now().astimezone()
+    rows = [
+        {"pk": pk, "n": i * 10} if i % 2 else {"pk": pk, "s": f"s{i}", "d": {"y": i}, "dt": now}
+        for i, pk in enumerate(pks)
+    ]
+    assert db.bulk_update("t", *rows, chunk_size=3) == 10
+    for i, row in enumerate(db.select("t", order="pk")):
+        if i % 2:
+            assert (row["n"], row["s"], row["d"], row["dt"]) == (i * 10, "", {"x": i}, None)
+        else:
+            assert (row["n"], row["s"], row["d"], row["dt"]) == (i, f"s{i}", {"y": i}, now)
+    assert db.bulk_update("t", {"pk": pks[0], "o": "foo"}, {"pk": pks[1], "o": None}) == 2
+    assert db.select("t", "o", pk__in=pks[:2], order="pk") == [{"o": "foo"}, {"o": None}]
+    assert db.bulk_update("t") == 0
+    with pytest.raises(ValueError, match=r"can't update row #2 of table 't' without a PK"):
+        db.bulk_update("t", {"pk": pks[0], "n": 1}, {"n": 2})
+    with pytest.raises(ValueError, match=r"table 't' has no column 'foo'"):
+        db.bulk_update("t", {"pk": pks[0], "foo": 1})
+    with pytest.raises(ValueError, match=r"invalid chunk size 0 \(expected a positive integer\)"):
+        db.bulk_update("t", {"pk": pks[0], "n": 1}, chunk_size=0)
+
+
+def test_bulk_update_parameter_limit(db: Database, rs: list[Row], monkeypatch: pytest.MonkeyPatch) -> None:
+    pks = db.insert("t", *rs)
+    module = sys.modules[type(db).__module__]
+    for name in ["SQLITE_MAX_PARAMETERS", "POSTGRESQL_MAX_PARAMETERS", "MYSQL_MAX_PARAMETERS"]:
+        monkeypatch.setattr(module, name, 10)
+    # Every changed column binds two parameters (and every row binds its PK once more), so rows with two changes take
+    # five parameters, and only two of them fit in a statement, whatever the chunk size.
+    rows = [{"pk": pk, "n": n * 10, "s": f"s{n}"} for n, pk in enumerate(pks)]
+    events: list[AuditEvent] = []
+    with db.audit(events.append):
+        assert db.bulk_update("t", *rows, chunk_size=100) == 10
+    names: list[str] = []
+    while events:
+        event = events.pop(0)
+        names.append(event.name)
+        events.extend(event.children)
+    assert names.count("execute") == 5
+    assert db.select("t", ["n", "s"], order="pk") == [{"n": n * 10, "s": f"s{n}"} for n in range(10)]
@@ -1,11 +1,20 @@
 import re
+import sys
 
 import pytest
 
-from tunqi.sync import Database, DoesNotExistError, Error, Model, OptionalFK
+from tunqi.sync import (
+    AuditEvent,
+    Database,
+    DoesNotExistError,
+    Error,
+    IdentityMap,
+    Model,
+    OptionalFK,
+)
 
 from ...conftest import fields
-from .conftest import Comment, Post, User
+from .conftest import Comment, Post, Tag, User
 
 
 def test_fk(user1: User, post1a: Post) -> None:
@@ -552,3 +561,218 @@ def test_table(
         {f"{prefix}.pk": comment1aY.pk, f"{prefix}.post": post1a.pk, f"{prefix}.content": "comment 1aY"},
         {f"{prefix}.pk": comment1bX.pk, f"{prefix}.post": post1b.pk, f"{prefix}.content": "comment 1bX"},
     ]
+
+
+def test_backref_page(user1: User, user2: User, post1a: Post, post1b: Post, post2a: Post) -> None:
+    page, cursor = user1.posts.page(size=1)
+    assert page == [post1a]
+    assert user1.posts.page(size=1, cursor=cursor) == ([post1b], None)
+    page, cursor = user1.posts.page(order=["-content"], size=1)
+    assert page == [post1b]
+    assert user1.posts.page(order=["-content"], size=1, cursor=cursor) == ([post1a], None)
+    assert user2.posts.page() == ([post2a], None)
+
+
+def test_page_with_joins(
+    user1: User,
+    user2: User,
+    post1a: Post,
+    post2a: Post,
+    comment1aX: Comment,
+    comment1aY: Comment,
+    comment2aX: Comment,
+) -> None:
+    page, cursor = User.page(order=["-posts.commentary.content"], size=1)
+    assert page == [user2]
+    assert User.page(order=["-posts.commentary.content"], size=1, cursor=cursor) == ([user1], None)
+    page, cursor = User.page(posts__commentary__content__startswith="comment", size=1)
+    assert page == [user1]
+    assert User.page(posts__commentary__content__startswith="comment", cursor=cursor) == ([user2], None)
+
+
+def test_prefetch(
+    db: Database,
+    user1: User,
+    user2: User,
+    post1a: Post,
+    post2a: Post,
+    comment1aX: Comment,
+    comment1aY: Comment,
+    comment2aX: Comment,
+) -> None:
+    events: list[AuditEvent] = []
+    with db.audit(events.append):
+        comments = Comment.all(prefetch=["post.user"], order=["content"])
+        assert [event.name for event in events] == ["select", "select", "select"]
+        posts = [comment.post.get() for comment in comments]
+        assert posts == [post1a, post1a, post2a]
+        users: list[User | None] = []
+        for post in posts:
+            assert post is not None
+            users.append(post.user.get())
+        assert users == [user1, user1, user2]
+    events.clear()
+    with db.audit(events.append):
+        comment = Comment.get(comment2aX.pk, prefetch=["post"])
+        assert comment.post.get() == post2a
+        assert [event.name for event in events] == ["select_one", "select"]
+    events.clear()
+    with db.audit(events.append):
+        posts = [comment.post.get() for comment in Comment.stream(prefetch=["post"], batch_size=2)]
+        assert posts == [post1a, post1a, post2a]
+        assert [event.name for event in events] == ["stream_select", "select", "select"]
+    with pytest.raises(ValueError, match=r"can't prefetch Comment.content \(available relations are post\)"):
+        Comment.all(prefetch=["content"])
+
+
+def test_prefetch_backref(
+    db: Database,
+    user1: User,
+    user2: User,
+    post1a: Post,
+    post1b: Post,
+    post2a: Post,
+    comment1aX: Comment,
+    comment2aX: Comment,
+) -> None:
+    events: list[AuditEvent] = []
+    with db.audit(events.append):
+        users = User.all(prefetch=["posts.commentary"])
+        assert [user.posts.all() for user in users] == [[post1a, post1b], [post2a]]
+        posts = users[0].posts.all()
+        assert [post.commentary.all() for post in posts] == [[comment1aX], []]
+        assert [post.user.get() for post in posts] == [user1, user1]
+        assert [event.name for event in events] == ["select", "select", "select"]
+    events.clear()
+    with db.audit(events.append):
+        assert users[0].posts.all(content="post 1b") == [post1b]
+        assert [event.name for event in events] == ["select"]
+    post = Post(content="post 1c")
+    users[0].posts.create(post)
+    assert users[0].posts.all() == [post1a, post1b, post]
+    with pytest.raises(ValueError, match=r"can't prefetch User.foo \(available relations are posts\)"):
+        User.all(prefetch=["foo"])
+
+
+def test_prefetch_m2m(db: Database, post1a: Post, post1b: Post, post2a: Post, tag1: Tag, tag2: Tag) -> None:
+    post1a.tagging.add(tag1, tag2)
+    post2a.tagging.add(tag2)
+    events: list[AuditEvent] = []
+    with db.audit(events.append):
+        posts = Post.all(prefetch=["tagging"])
+        assert [post.tagging.all() for post in posts] == [[tag1, tag2], [], [tag2]]
+        assert [event.name for event in events] == ["select", "select_links", "select"]
+    posts[1].tagging.add(tag1)
+    assert posts[1].tagging.all() == [tag1]
+
+
+def test_prefetch_parameter_limit(
+    db: Database,
+    user1: User,
+    user2: User,
+    post1a: Post,
+    post1b: Post,
+    post2a: Post,
+    comment1aX: Comment,
+    comment2aX: Comment,
+    tag1: Tag,
+    tag2: Tag,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    post1a.tagging.add(tag1)
+    post2a.tagging.add(tag1, tag2)
+    module = sys.modules[type(db).__module__]
+    for name in ["SQLITE_MAX_PARAMETERS", "POSTGRESQL_MAX_PARAMETERS", "MYSQL_MAX_PARAMETERS"]:
+        monkeypatch.setattr(module, name, 2)
+    # Half of the parameters are left for the rest of the query, so every chunk's IN list has a single value.
+    events: list[AuditEvent] = []
+    with db.audit(events.append):
+        comments = Comment.all(prefetch=["post.user"], order=["content"])
+        assert [event.name for event in events] == ["select"] * 5
+        posts = [comment.post.get() for comment in comments]
+        assert posts == [post1a, post2a]
+        assert [post.user.get() for post in posts if post is not None] == [user1, user2]
+    events.clear()
+    with db.audit(events.append):
+        users = User.all(prefetch=["posts"])
+        assert [user.posts.all() for user in users] == [[post1a, post1b], [post2a]]
+        assert [event.name for event in events] == ["select"] * 3
+    events.clear()
+    with db.audit(events.append):
+        tagged_posts = Post.all(prefetch=["tagging"])
+        assert [post.tagging.all() for post in tagged_posts] == [[tag1], [], [tag1, tag2]]
+        assert [event.name for event in events] == ["select", "select_links", "select", "select"]
+        [select_links] = [event for event in events if event.name == "select_links"]
+        # Each chunk of the links is selected by a statement of its own.
+        assert [child.name for child in select_links.children] == ["connect"] * 3
+
+
+def test_identity_map(db: Database, user1: User, user2: User, post1a: Post) -> None:
+    events: list[AuditEvent] = []
+    with IdentityMap(size=2) as identity_map, db.audit(events.append):
+        # Loaded models are mapped, so getting them by PK (directly or through a foreign key) doesn't query them again.
+        post = Post.get(post1a.pk)
+        user = post.user.get()
+        assert User.get(user1.pk) is user
+        assert (Post.get(post1a.pk)).user.get() is user
+        assert [event.name for event in events] == ["select_one", "select_one"]
+        # Models loaded by other queries resolve to the mapped instances as well.
+        assert (User.all(order="pk"))[0] is user
+        assert (User.get(name=user1.name)) is user
+        # The least recently used models are evicted.
+        assert len(identity_map) == 2
+        assert post1a.pk is not None
+        assert identity_map.get(Post, post1a.pk) is None
+        events.clear()
+        assert Post.get(post1a.pk) is not post
+        assert [event.name for event in events] == ["select_one"]
+        # Created models are mapped, and deleted models are unmapped.
+        user3 = User(name="user 3")
+        user3.save()
+        assert User.get(user3.pk) is user3
+        pk = user3.pk
+        user3.delete()
+        with pytest.raises(DoesNotExistError):
+            User.get(pk)
+    # The identity map is cleared on exit, and models are no longer mapped outside of it.
+    assert len(identity_map) == 0
+    assert User.get(user1.pk) is not user
+    with pytest.raises(ValueError, match=r"invalid identity map size 0 \(expected a positive integer\)"):
+        IdentityMap(size=0)
+
+
+def test_identity_map_with_queries(db: Database, user1: User, post1a: Post, post2a: Post) -> None:
+    assert user1.pk is not None and post1a.pk is not None and post2a.pk is not None
+    with IdentityMap():
+        # Saving a mapped model keeps it mapped.
+        user = User.get(user1.pk)
+        user.name = "a"
+        user.save()
+        assert User.get(user1.pk) is user
+        # Updates and deletes by query evict the table's models, so they're loaded anew rather than returned stale.
+        User.update(name="a")(name="b")
+        assert (User.get(user1.pk)).name == "b"
+        db.update("user", pk=user1.pk)(name="c")
+        assert (User.get(user1.pk)).name == "c"
+        db.bulk_update("user", {"pk": user1.pk, "name": "d"})
+        user = User.get(user1.pk)
+        assert user.name == "d"
+        user.name = "e"
+        User.bulk_update([user])
+        assert User.get(user1.pk) is user
+        # Deletes evict the models of the tables that reference the table as well, since they might cascade.
+        Post.get(post1a.pk)
+        User.delete_all(name="e")
+        with pytest.raises(DoesNotExistError):
+            User.get(user1.pk)
+        with pytest.raises(DoesNotExistError):
+            Post.get(post1a.pk)
+        # Fetching a related model skips the identity map, and maps the fetched model instead.
+        post = Post.get(post2a.pk)
+        mapped = post.user.get()
+        assert mapped is not None
+        mapped.name = "f"
+        fetched = post.user.get(fetch=True)
+        assert fetched is not None and fetched is not mapped
+        assert fetched.name == "user 2"
+        assert User.get(fetched.pk) is fetched
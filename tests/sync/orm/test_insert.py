@@ -196,3 +196,12 @@ def test_unique_together() -> None:
         u3.save()
     with pytest.raises(AlreadyExistsError, match="u with s1 'b' and s2 'c' already exists"):
         u4.save()
+
+
+def test_bulk_load(ts: list[T]) -> None:
+    assert T.bulk_load(t for t in ts) == 10
+    assert all(t.pk is None for t in ts)
+    assert [t.model_dump(exclude={"pk"}) for t in T.all(order=["pk"])] == [t.model_dump(exclude={"pk"}) for t in ts]
+    t = T.get(pk=1)
+    with pytest.raises(ValueError, match=re.escape(f"{t} (item #1) already exists")):
+        T.bulk_load([t])
@@ -3,9 +3,9 @@ from typing import Any
 
 import pytest
 
-from tunqi.sync import DoesNotExistError, Model
+from tunqi.sync import FK, Database, DoesNotExistError, MemoryCache, Model, c, param
 
-from .conftest import T
+from .conftest import F, T
 
 
 def test_select_one(t1: T, t2: T) -> None:
@@ -35,6 +35,13 @@ def test_select_with_query(t2: T, condition: tuple[str, Any, bool]) -> None:
     assert T.all(**{key: value}) == ([t2] if expected else [])
 
 
+def test_select_columns(ts: list[T]) -> None:
+    T.create(*ts)
+    columns = T.all_columns(["n", "b"], order="-n", limit=3, arrays=False)
+    assert columns == {"n": [9, 8, 7], "b": [False, True, False]}
+    assert T.all_columns("n", b=True, arrays=False) == {"n": [0, 2, 4, 6, 8]}
+
+
 def test_select_with_range(ts: list[T]) -> None:
     T.create(*ts)
     assert T.all(limit=5) == ts[:5]
@@ -119,3 +126,165 @@ def test_select_invalid() -> None:
         U.get(s__x=1)
     with pytest.raises(ValueError, match=re.escape(error)):
         U.all(order="s.x")
+
+
+def test_stream(ts: list[T]) -> None:
+    assert [t for t in T.stream()] == []
+    T.create(*ts)
+    assert [t for t in T.stream(batch_size=3)] == ts
+    assert [t for t in T.stream(order="-n", batch_size=4)] == ts[::-1]
+    assert [t for t in T.stream(b=True)] == ts[::2]
+    assert [t for t in T.stream(limit=5, offset=3)] == ts[3:8]
+
+
+def test_page(ts: list[T]) -> None:
+    assert T.page() == ([], None)
+    T.create(*ts)
+    page, cursor = T.page(order=["-n"], size=6)
+    assert page == ts[::-1][:6]
+    assert T.page(order=["-n"], size=6, cursor=cursor) == (ts[::-1][6:], None)
+
+
+def test_select_without_validation(t2: T, ts: list[T]) -> None:
+    T.create(*ts)
+    assert T.all(order="pk", validate=False) == ts
+    assert T.get(ts[0].pk, validate=False) == ts[0]
+    assert [t for t in T.stream(validate=False)] == ts
+    assert T.page(order=["-n"], size=20, validate=False) == (ts[::-1], None)
+    # JSON values are still validated (so nested models are parsed), and the state is tracked as usual.
+    t2.save()
+    t = T.get(t2.pk, validate=False)
+    assert t == t2
+    assert isinstance(t.f, F)
+    assert all(isinstance(f, F) for f in t.fs)
+    assert t.changed() == {}
+    t.ss.append("baz")
+    assert list(t.changed()) == ["ss"]
+
+
+def test_select_without_validation_fks() -> None:
+
+    class A(Model):
+        s: str
+
+    class B(Model):
+        a: FK[A]
+
+    Model.create_tables()
+    a = A(s="a").save()
+    b = B(a=a).save()
+    b2 = B.get(b.pk, validate=False)
+    assert b2 == b
+    assert b2.a.pk == a.pk
+    assert b2.a.get() == a
+
+
+def test_prepare(db: Database) -> None:
+
+    class A(Model):
+        s: str
+
+    class B(Model):
+        a: FK[A]
+        n: int
+
+    Model.create_tables()
+    a1, a2 = A(s="a").save(), A(s="b").save()
+    bs = [B(a=a1 if n % 2 else a2, n=n) for n in range(5)]
+    B.create(*bs)
+    by_a = B.prepare(a__s=param("s"), order=["-n"], prefetch=["a"])
+    assert by_a(s="a") == [bs[3], bs[1]]
+    assert by_a(s="c") == []
+    by_n = B.prepare(n=param("n"), prefetch=["a"])
+    events: list[Any] = []
+    with db.audit(events.append):
+        [b] = by_n(n=4)
+        assert b.a.get() == a2
+        assert [(event.name, event.data.get("prepared")) for event in events] == [("select", True), ("select", None)]
+    by_n = B.prepare(n=param("n"), validate=False)
+    assert by_n.one(n=2) == bs[2]
+    with pytest.raises(DoesNotExistError, match=re.escape("b with n == :n doesn't exist (n=5)")):
+        by_n.one(n=5)
+
+
+def test_cache(db: Database) -> None:
+    cache = MemoryCache(size=3)
+
+    class C(Model, cache=cache):
+        s: str
+        n: int
+
+    C.create_tables()
+    c1, c2 = C(s="a", n=1), C(s="b", n=2)
+    C.create(c1, c2)
+    assert (C.get(c1.pk)).s == "a"
+    assert (C.get(c1.pk)).s == "a"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [model.s for model in C.all(order="pk")] == ["a", "b"]
+    assert [model.s for model in C.all(order="pk")] == ["a", "b"]
+    assert (cache.hits, cache.misses) == (2, 2)
+    # Queries with expressions, and queries in transactions, are not cached.
+    assert [model.s for model in C.all(where=c.n > 1)] == ["b"]
+    with db.transaction():
+        assert (C.get(c1.pk)).s == "a"
+    assert (cache.hits, cache.misses, len(cache)) == (2, 2, 2)
+    # Writes invalidate the cache, whether they're done through the model or the database.
+    c1.s = "c"
+    c1.save()
+    assert len(cache) == 0
+    assert (C.get(c1.pk)).s == "c"
+    db.update("c", pk=c1.pk)(s="d")
+    assert (C.get(c1.pk)).s == "d"
+    c2.delete()
+    assert [model.s for model in C.all(order="pk")] == ["d"]
+    db.insert("c", {"s": "e", "n": 3})
+    assert [model.s for model in C.all(order="pk")] == ["d", "e"]
+    # Results cached in a transaction are invalidated once it ends, even if it's rolled back.
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            C.create(C(s="f", n=4))
+            raise RuntimeError()
+    assert [model.s for model in C.all(order="pk")] == ["d", "e"]
+    # The least recently used results are evicted.
+    C.get(s="d")
+    C.get(s="e")
+    C.get(n=3)
+    assert len(cache) == 3
+    hits = cache.hits
+    C.get(s="d")
+    C.all(order="pk")
+    assert cache.hits == hits + 1
+    # And expired results are evicted as well.
+    cache.clear()
+    cache.ttl = 0
+    C.get(s="d")
+    C.get(s="d")
+    assert (len(cache), cache.hits, cache.misses) == (1, 0, 2)
+
+
+def test_cache_with_relations(db: Database) -> None:
+    cache = MemoryCache()
+
+    class A(Model, cache=cache):
+        s: str
+
+    class B(Model, cache=cache):
+        a: FK[A]
+        n: int
+
+    Model.create_tables()
+    a1, a2 = A(s="a").save(), A(s="b").save()
+    B.create(B(a=a1, n=1), B(a=a2, n=2))
+    # Queries that filter or order by related tables aren't cached, since writes to them don't invalidate the results.
+    assert [b.n for b in B.all(a__s="a")] == [1]
+    assert [b.n for b in B.all(order=["-a.s"])] == [2, 1]
+    assert len(cache) == 0
+    a1.s = "c"
+    a1.save()
+    assert B.all(a__s="a") == []
+    assert [b.n for b in B.all(order=["-a.s"])] == [1, 2]
+    # Writes to a table also invalidate the tables that reference it, since deletes might cascade to them.
+    assert [b.n for b in B.all(order="n")] == [1, 2]
+    assert len(cache) == 1
+    a1.delete()
+    assert [b.n for b in B.all(order="n")] == [2]
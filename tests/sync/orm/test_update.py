@@ -167,3 +167,89 @@ def test_update_many_transaction() -> None:
     a2.refresh()
     assert a1.s == "foo"
     assert a2.s == "bar"
+
+
+def test_bulk_update(ts: list[T]) -> None:
+    T.create(*ts)
+    assert T.bulk_update(ts) == 0
+    for n, t in enumerate(ts):
+        t.n = n * 10
+        if n % 2:
+            t.s = f"s{n}"
+            t.d = {"n": n}
+    assert T.bulk_update(ts[:9], fields=["n"]) == 8
+    assert ts[1].changed() == {"s": ("", "s1"), "d": ({"x": 1}, {"n": 1})}
+    assert T.bulk_update(ts) == 5
+    assert all(not t.changed() for t in ts)
+    assert T.all(order=["pk"]) == ts
+    with pytest.raises(ValueError, match=r"T has no field 'foo' \(available fields are b, n, .*\)"):
+        T.bulk_update(ts, fields=["foo"])
+    t = T(**ts[0].model_dump(exclude={"pk"}))
+    with pytest.raises(ValueError, match=re.escape(f"{t} doesn't exists")):
+        T.bulk_update([t])
+
+
+def test_bulk_update_before_and_after() -> None:
+    updated: list[dict[str, Any]] = []
+
+    class A(Model):
+        n: int
+        s: str
+
+        def before_update(self):
+            self.s = f"s{self.n}"
+            updated.append(self.changed())
+
+        def after_update(self):
+            updated.append(self.changed())
+
+    Model.create_tables()
+    a1 = A(n=1, s="s1")
+    a2 = A(n=2, s="s2")
+    A.create(a1, a2)
+    a1.n = 3
+    assert A.bulk_update([a1, a2]) == 1
+    assert updated == [{"n": (1, 3), "s": ("s1", "s3")}, {}]
+    assert [(a.n, a.s) for a in A.all()] == [(3, "s3"), (2, "s2")]
+
+
+def test_bulk_update_state_restoration() -> None:
+    class A(Model):
+        n: int
+
+        def after_update(self):
+            raise ValueError()
+
+    Model.create_tables()
+    a1 = A(n=1)
+    a2 = A(n=2)
+    A.create(a1, a2)
+    a1.n, a2.n = 3, 4
+    with pytest.raises(ValueError):
+        A.bulk_update([a1, a2])
+    assert a1.changed() == {"n": (1, 3)}
+    assert a2.changed() == {"n": (2, 4)}
+    assert [a.n for a in A.all()] == [1, 2]
+
+
+def test_bulk_update_hooks_in_transaction() -> None:
+    class A(Model):
+        n: int
+
+        def before_update(self):
+            if self.n == 4:
+                raise ValueError()
+            A.create(A(n=0))
+
+    Model.create_tables()
+    a1 = A(n=1)
+    a2 = A(n=2)
+    A.create(a1, a2)
+    a1.n, a2.n = 3, 4
+    # The hooks run in the update's transaction, so whatever they did is rolled back along with it.
+    with pytest.raises(ValueError):
+        A.bulk_update([a1, a2], chunk_size=1)
+    assert [a.n for a in A.all()] == [1, 2]
+    a2.n = 5
+    assert A.bulk_update([a1, a2], chunk_size=1) == 2
+    assert sorted(a.n for a in A.all()) == [0, 0, 3, 5]
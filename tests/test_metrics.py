@@ -0,0 +1,20 @@
+import pytest
+
+from tunqi.metrics import Histogram
+
+
+def test_histogram() -> None:
+    histogram = Histogram([1, 2, 4])
+    assert histogram.quantile(0.5) is None
+    for value in [0.5, 1.5, 1.5, 3, 8]:
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert list(histogram.cumulative_counts()) == [(1, 1), (2, 3), (4, 4), (float("inf"), 5)]
+    assert (histogram.count, histogram.sum, histogram.min, histogram.max) == (5, 14.5, 0.5, 8)
+    assert histogram.quantile(0) == 0.5
+    assert histogram.quantile(0.5) == 1.75
+    assert histogram.quantile(1) == 8
+    with pytest.raises(ValueError, match="invalid quantile 2"):
+        histogram.quantile(2)
+    with pytest.raises(ValueError, match="at least one bucket"):
+        Histogram([])
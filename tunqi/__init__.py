@@ -1,9 +1,13 @@
 from .audit import AuditEvent, Auditor
 from .core import (
+    Batch,
     Condition,
     Database,
     Expression,
+    MemoryCache,
+    PreparedQuery,
     Query,
+    ResultCache,
     Row,
     Selector,
     Selectors,
@@ -11,10 +15,24 @@ from .core import (
     c,
     function,
     functions,
+    param,
     q,
 )
 from .errors import AlreadyExistsError, DoesNotExistError, Error
-from .orm import FK, M2M, PK, Backref, Index, Model, OptionalFK, Unique, length, unique
+from .metrics import Metrics
+from .orm import (
+    FK,
+    M2M,
+    PK,
+    Backref,
+    IdentityMap,
+    Index,
+    Model,
+    OptionalFK,
+    Unique,
+    length,
+    unique,
+)
 
 __all__ = [
     "Database",
@@ -29,11 +47,17 @@ __all__ = [
     "c",
     "Query",
     "q",
+    "param",
+    "PreparedQuery",
+    "Batch",
     "Condition",
     "function",
     "functions",
+    "ResultCache",
+    "MemoryCache",
     "Auditor",
     "AuditEvent",
+    "Metrics",
     "Model",
     "PK",
     "Unique",
@@ -42,6 +66,7 @@ __all__ = [
     "OptionalFK",
     "Backref",
     "M2M",
+    "IdentityMap",
     "unique",
     "length",
 ]
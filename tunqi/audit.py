@@ -2,12 +2,26 @@ from __future__ import annotations
 
 import datetime as dt
 import time
+from contextlib import suppress
 from contextvars import ContextVar
 from types import TracebackType
-from typing import TYPE_CHECKING, Any, Callable, ClassVar, Mapping, Self, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    ItemsView,
+    Iterator,
+    KeysView,
+    Mapping,
+    Self,
+    ValuesView,
+    cast,
+)
 
 import sqlparse
 from sqlalchemy import ClauseElement, Executable
+from sqlparse.exceptions import SQLParseError
 
 if TYPE_CHECKING:  # pragma: no cover
     from tunqi.core.database import Database
@@ -15,8 +29,79 @@ if TYPE_CHECKING:  # pragma: no cover
 type Auditor = Callable[[AuditEvent], None]
 
 
+class Lazy:
+
+    __slots__ = "function", "args"
+
+    def __init__(self, function: Callable[..., Any], *args: Any) -> None:
+        self.function = function
+        self.args = args
+
+    def __repr__(self) -> str:
+        return f"<lazy {self.function.__name__}>"
+
+    def __call__(self) -> Any:
+        return self.function(*self.args)
+
+
+class AuditData(dict[str, Any]):
+
+    def __getitem__(self, key: str) -> Any:
+        value = super().__getitem__(key)
+        # Lazy values (like formatted statements) are only computed once they're actually read.
+        if isinstance(value, Lazy):
+            value = value()
+            self[key] = value
+        return value
+
+    def __repr__(self) -> str:
+        self._resolve()
+        return super().__repr__()
+
+    def __eq__(self, other: object) -> bool:
+        self._resolve()
+        return super().__eq__(other)
+
+    def get(self, key: str, default: Any = None) -> Any:  # type: ignore[override]
+        return self[key] if key in self else default
+
+    def pop(self, key: str, *default: Any) -> Any:  # type: ignore[override]
+        if key not in self:
+            return super().pop(key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        # Overriding iteration also makes dict(data) and {**data} read the values through __getitem__, so that lazy
+        # values don't leak out.
+        self._resolve()
+        return super().__iter__()
+
+    def keys(self) -> KeysView[str]:  # type: ignore[override]
+        self._resolve()
+        return super().keys()
+
+    def items(self) -> ItemsView[str, Any]:  # type: ignore[override]
+        self._resolve()
+        return super().items()
+
+    def values(self) -> ValuesView[Any]:  # type: ignore[override]
+        self._resolve()
+        return super().values()
+
+    def copy(self) -> AuditData:
+        return AuditData(super().items())
+
+    def _resolve(self) -> None:
+        for key in super().keys():
+            self[key]
+
+
 class AuditEventBase:
 
+    _active_event: ClassVar[ContextVar[AuditEventBase | None]] = ContextVar("active_event", default=None)
+
     def __enter__(self) -> Self:
         return self
 
@@ -30,9 +115,22 @@ class AuditEventBase:
         pass
 
 
+class UnsampledAuditEvent(AuditEventBase):
+
+    # Stands in for a top-level event that was left out of the sample, so that its children aren't audited either.
+    __slots__ = ("_parent",)
+
+    def __enter__(self) -> Self:
+        self._parent = self._active_event.get()
+        self._active_event.set(self)
+        return self
+
+    def __exit__(self, *_) -> None:
+        self._active_event.set(self._parent)
+
+
 class AuditEvent(AuditEventBase):
 
-    _active_event: ClassVar[ContextVar[AuditEvent | None]] = ContextVar("active_event", default=None)
     __slots__ = "database", "name", "data", "start_time", "end_time", "error", "children", "_parent"
 
     def __init__(
@@ -43,7 +141,7 @@ class AuditEvent(AuditEventBase):
     ) -> None:
         self.database = database
         self.name = name
-        self.data = data
+        self.data = AuditData(data)
         self.start_time = time.time()
         self.end_time: float | None = None
         self.error: Exception | None = None
@@ -57,7 +155,7 @@ class AuditEvent(AuditEventBase):
         return f"<audit event {self.name!r}>"
 
     def __enter__(self) -> Self:
-        self._parent = self._active_event.get()
+        self._parent = cast(AuditEvent | None, self._active_event.get())
         self._active_event.set(self)
         if self._parent:
             self._parent.children.append(self)
@@ -94,7 +192,15 @@ class AuditEvent(AuditEventBase):
         self.data.update(data)
 
     def set_statement(self, statement: Executable, values: Mapping[str, Any] | None = None) -> None:
+        # Formatting the statement often costs more than executing it, so it's deferred until it's actually read.
+        if isinstance(values, Mapping):
+            values = dict(values)
+        self.set(statement=Lazy(self._format_statement, statement, values))
+
+    def _format_statement(self, statement: Executable, values: Mapping[str, Any] | None) -> str:
         clause = cast(ClauseElement, statement)
         output = self.database._format_clause(clause, values)
-        output = sqlparse.format(output, reindent=True, keyword_case="upper")
-        self.set(statement=output)
+        # sqlparse refuses to format very large statements (e.g. inserts of thousands of rows), so they're kept as-is.
+        with suppress(SQLParseError):
+            output = sqlparse.format(output, reindent=True, keyword_case="upper")
+        return output
@@ -1,8 +1,11 @@
+from .batch import Batch
 from .condition import Condition
 from .database import Database
 from .expression import Expression, c
 from .functions_ import function, functions
-from .query import Query, q
+from .prepared import PreparedQuery
+from .query import Query, param, q
+from .result_cache import MemoryCache, ResultCache
 from .selector import Selector, Selectors
 from .table import Row, Table
 
@@ -16,7 +19,12 @@ __all__ = [
     "c",
     "Query",
     "q",
+    "param",
+    "PreparedQuery",
+    "Batch",
     "Condition",
     "function",
     "functions",
+    "ResultCache",
+    "MemoryCache",
 ]
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Sequence, cast
+
+from sqlalchemy import ColumnElement, FromClause, Select, literal_column, select, true
+
+from tunqi.core.condition import Condition
+from tunqi.core.expression import Expression
+from tunqi.core.query import Query
+from tunqi.core.result_cache import MISSING
+from tunqi.core.selector import Selectors, SelectorTypes
+from tunqi.core.table import Row, Table
+from tunqi.errors import DoesNotExistError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from tunqi.core.database import Database
+
+# Columns can't start with an underscore (Pydantic treats such fields as private), so these names never collide.
+FOUND = "_found"
+BASE = "_batch"
+
+
+class BatchedQuery[T]:
+
+    def __init__(
+        self,
+        batch: Batch,
+        table: Table,
+        statement: Select,
+        load: Callable[[Sequence[Any]], T],
+        scalar: bool = True,
+    ) -> None:
+        self.batch = batch
+        self.table = table
+        self.statement = statement
+        self.scalar = scalar
+        self._load = load
+        self._result: Any = MISSING
+        self._error: Exception | None = None
+
+    def __str__(self) -> str:
+        return f"batched query of {self.table.plural} ({'pending' if self.pending else 'done'})"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    @property
+    def pending(self) -> bool:
+        return self._result is MISSING and self._error is None
+
+    async def get(self) -> T:
+        # If the result is needed before the batch is over, it's flushed early (along with the other pending queries).
+        if self.pending:
+            await self.batch.flush()
+        if self._error is not None:
+            raise self._error
+        return cast(T, self._result)
+
+    def _resolve(self, values: Sequence[Any]) -> None:
+        # Errors (like a missing row, or a value that fails to deserialize) are raised by get(), and don't affect the
+        # other queries.
+        try:
+            self._result = self._load(values)
+        except Exception as error:
+            self._error = error
+
+
+class Batch:
+
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        self.queries: list[BatchedQuery[Any]] = []
+
+    def __str__(self) -> str:
+        return f"batch of {len(self.queries)} queries"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def exists(self, table_name: str, *, where: Expression | Query | None = None, **query: Any) -> BatchedQuery[bool]:
+        table = self.database.get_table(table_name)
+        condition = Condition.create(table, where, **query)
+        return self._add(BatchedQuery(self, table, table.exists(condition), lambda values: bool(values[0])))
+
+    def count(
+        self,
+        table_name: str,
+        /,
+        distinct: SelectorTypes = False,
+        *,
+        where: Expression | Query | None = None,
+        **query: Any,
+    ) -> BatchedQuery[int]:
+        table = self.database.get_table(table_name)
+        selectors = Selectors.resolve(table, distinct)
+        condition = Condition.create(table, where, **query)
+        return self._add(BatchedQuery(self, table, table.count(selectors, condition), lambda values: values[0] or 0))
+
+    def select_one(
+        self,
+        table_name: str,
+        /,
+        fields: SelectorTypes = True,
+        *,
+        where: Expression | Query | None = None,
+        **query: Any,
+    ) -> BatchedQuery[Row]:
+        table = self.database.get_table(table_name)
+        selectors = Selectors.resolve(table, fields)
+        condition = Condition.create(table, where, **query)
+        statement = table.select(selectors, condition, limit=1)
+        deserialize = self.database._row_deserializer(statement, statement.selected_columns.keys())
+
+        def load(values: Sequence[Any]) -> Row:
+            *row, found = values
+            if found is None:
+                if condition:
+                    raise DoesNotExistError(f"{table.name} with {condition} doesn't exist")
+                raise DoesNotExistError(f"no {table.plural} exist")
+            return deserialize(row)
+
+        return self._add(BatchedQuery(self, table, statement, load, scalar=False))
+
+    async def flush(self) -> None:
+        queries, self.queries = self.queries, []
+        if not queries:
+            return
+        with self.database._audit("batch", queries=len(queries)):
+            try:
+                statement, spans = self._combine(queries)
+                async with self.database._read_connection():
+                    async with self.database.execute(statement) as cursor:
+                        row = cursor.one()
+            except Exception as error:
+                for query in queries:
+                    query._error = error
+                raise
+            for query, (start, end) in zip(queries, spans):
+                query._resolve(row[start:end])
+
+    def discard(self) -> None:
+        queries, self.queries = self.queries, []
+        for query in queries:
+            query._error = RuntimeError(f"batched query of {query.table.plural} was discarded before it was executed")
+
+    def _add[T](self, query: BatchedQuery[T]) -> BatchedQuery[T]:
+        self.queries.append(query)
+        return query
+
+    def _combine(self, queries: list[BatchedQuery[Any]]) -> tuple[Select, list[tuple[int, int]]]:
+        # All the queries are combined into a single statement that returns a single row, so they take one round-trip:
+        # scalar queries (counts and exists) become scalar subqueries, and the rest become subqueries that are outer
+        # joined to a single-row base (so that a missing row doesn't make the entire result empty), with a marker column
+        # that tells it apart from a row of nulls.
+        columns: list[ColumnElement] = []
+        spans: list[tuple[int, int]] = []
+        from_: FromClause | None = None
+        for n, query in enumerate(queries):
+            start = len(columns)
+            if query.scalar:
+                columns.append(query.statement.correlate(None).scalar_subquery().label(f"q{n}"))
+            else:
+                subquery = query.statement.add_columns(literal_column("1").label(FOUND)).subquery(f"q{n}")
+                if from_ is None:
+                    from_ = select(literal_column("1").label(FOUND)).subquery(BASE)
+                from_ = from_.outerjoin(subquery, true())
+                columns.extend(column.label(f"q{n}_{m}") for m, column in enumerate(subquery.c))
+            spans.append((start, len(columns)))
+        statement = select(*columns)
+        if from_ is not None:
+            statement = statement.select_from(from_)
+        return statement, spans
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Iterable
+
+
+async def async_gather[T](
+    operations: Iterable[Awaitable[T]],
+    max_concurrency: int | None = None,
+    setup: Callable[[], Any] | None = None,
+    sequential: bool = False,
+) -> list[T]:
+    if sequential:
+        return await _gather_sequentially(list(operations))
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def run(operation: Awaitable[T]) -> T:
+        # Every operation runs in its own task, and therefore in its own copy of the context, which setup can change
+        # without affecting the others.
+        if setup:
+            setup()
+        if semaphore is None:
+            return await operation
+        async with semaphore:
+            return await operation
+
+    tasks = [asyncio.ensure_future(run(operation)) for operation in operations]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        # If one of the operations fails, the rest are cancelled (and awaited, so their connections are released).
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def gather[T](
+    operations: Iterable[T],
+    max_concurrency: int | None = None,
+    setup: Callable[[], Any] | None = None,
+    sequential: bool = False,
+) -> list[T]:
+    # Synchronous operations are evaluated before they're passed, so by now there's nothing left to run concurrently.
+    return list(operations)
+
+
+async def _gather_sequentially[T](operations: list[Awaitable[T]]) -> list[T]:
+    results: list[T] = []
+    try:
+        for operation in operations:
+            results.append(await operation)
+    except BaseException:
+        # If one of the operations fails, the rest are closed, so that they're never run.
+        for operation in operations[len(results) + 1 :]:
+            if inspect.iscoroutine(operation):
+                operation.close()
+        raise
+    return results
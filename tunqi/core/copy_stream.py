@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+from typing import Any, Iterable, Iterator
+
+from tunqi.core.table import Row
+from tunqi.utils import and_
+
+NULL = "\\N"
+ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+class CopyStream:
+
+    def __init__(self, rows: Iterable[Row], columns: list[str], json_columns: set[str]) -> None:
+        self.columns = columns
+        self.json_columns = json_columns
+        self.count = 0
+        self._lines = self._encode_rows(rows)
+        self._buffer = bytearray()
+
+    def __str__(self) -> str:
+        return f"copy stream of {and_(self.columns)} ({self.count} rows so far)"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    def read(self, size: int = -1) -> bytes:
+        # The rows are encoded lazily, as the driver reads them, so they're never materialized all at once.
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer.extend(line)
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _encode_rows(self, rows: Iterable[Row]) -> Iterator[bytes]:
+        for row in rows:
+            values = [self._encode_value(column, row.get(column)) for column in self.columns]
+            self.count += 1
+            yield ("\t".join(values) + "\n").encode()
+
+    def _encode_value(self, column: str, value: Any) -> str:
+        # JSON columns store None as JSON null (like SQLAlchemy's JSON type does by default).
+        if column in self.json_columns:
+            return json.dumps(value).translate(ESCAPES)
+        if value is None:
+            return NULL
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        if isinstance(value, bytes):
+            return f"\\\\x{value.hex()}"
+        if isinstance(value, dt.datetime):
+            return value.isoformat()
+        return str(value).translate(ESCAPES)
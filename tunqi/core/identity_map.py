@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import collections
+from contextvars import ContextVar, Token
+from typing import Any, ClassVar, Collection, Protocol, Self, cast
+
+
+# Both the asynchronous and synchronous models are mapped, so they're typed structurally.
+class Identifiable(Protocol):
+    pk: Any
+
+
+class IdentityMap:
+
+    active_identity_map: ClassVar[ContextVar[IdentityMap | None]] = ContextVar("active_identity_map", default=None)
+
+    def __init__(self, size: int | None = None) -> None:
+        if size is not None and size < 1:
+            raise ValueError(f"invalid identity map size {size!r} (expected a positive integer)")
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._models: collections.OrderedDict[tuple[type, int], Identifiable] = collections.OrderedDict()
+        self._tokens: list[Token[IdentityMap | None]] = []
+
+    def __str__(self) -> str:
+        size = f"/{self.size}" if self.size else ""
+        return f"identity map ({len(self)}{size} models, {self.hits} hits, {self.misses} misses)"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __enter__(self) -> Self:
+        self._tokens.append(self.active_identity_map.set(self))
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.active_identity_map.reset(self._tokens.pop())
+        if not self._tokens:
+            self.clear()
+
+    @classmethod
+    def get_active(cls) -> IdentityMap | None:
+        return cls.active_identity_map.get()
+
+    def get[T: Identifiable](self, model_class: type[T], pk: int) -> T | None:
+        model = self._models.get((model_class, pk))
+        if model is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._models.move_to_end((model_class, pk))
+        return cast(T, model)
+
+    def add[T: Identifiable](self, model: T) -> T:
+        if model.pk is None:
+            raise ValueError(f"can't add the unsaved {model} to {self}")
+        key = type(model), model.pk
+        # If the model is already mapped, that instance is the one to use (so it's not overwritten by a fresh copy).
+        existing = self._models.get(key)
+        if existing is not None:
+            self._models.move_to_end(key)
+            return cast(T, existing)
+        self._models[key] = model
+        if self.size is not None and len(self._models) > self.size:
+            self._models.popitem(last=False)
+        return model
+
+    def remove(self, model_class: type, pk: int) -> None:
+        self._models.pop((model_class, pk), None)
+
+    def evict(self, table_names: Collection[str]) -> None:
+        # Writes by query might change (or delete) any of the tables' records, so their mapped models can't be trusted.
+        for key in [key for key in self._models if cast(Any, key[0])._config.table_name in table_names]:
+            del self._models[key]
+
+    def clear(self) -> None:
+        self._models.clear()
+        self.hits = 0
+        self.misses = 0
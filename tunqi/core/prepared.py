@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, cast
+
+from sqlalchemy import Executable
+
+from tunqi.core.condition import Condition
+from tunqi.core.statement_cache import CachedStatement
+from tunqi.core.table import Row, Table
+from tunqi.errors import DoesNotExistError
+from tunqi.utils import and_
+
+if TYPE_CHECKING:  # pragma: no cover
+    from tunqi.core.database import Database
+
+type Builder = Callable[[int | None], Executable]
+type Loader[T] = Callable[[list[Row]], Awaitable[list[T]]]
+
+
+class PreparedQuery[T]:
+
+    def __init__(
+        self,
+        database: Database,
+        table: Table,
+        build: Builder,
+        condition: Condition,
+        limit: int | None = None,
+        load: Loader[T] | None = None,
+    ) -> None:
+        self.database = database
+        self.table = table
+        self.condition = condition
+        self.limit = limit
+        self.parameters = condition.query.parameters() if condition.query else []
+        self._build = build
+        self._load = load
+        # The statements are built once and reused as-is, so SQLAlchemy compiles them once, and drivers that prepare
+        # statements on the server (like PostgreSQL's) can reuse them per connection.
+        self._statement = self._prepare(limit)
+        self._one_statement: CachedStatement | None = None
+
+    def __str__(self) -> str:
+        if not self.condition:
+            return f"prepared query of {self.table.plural}"
+        return f"prepared query of {self.table.plural} with {self.condition}"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    async def __call__(self, **values: Any) -> list[T]:
+        with self.database._audit("select", table=self.table.name, prepared=True) as event:
+            parameters = self._bind(self._statement, values)
+            results: list[Row] = []
+            event.set(rows=results)
+            async with self.database._read_connection():
+                async with self.database.execute(self._statement.statement, parameters) as cursor:
+                    deserialize = self.database._row_deserializer(self._statement.statement, cursor.keys())
+                    results.extend(map(deserialize, cursor))
+        return await self._load(results) if self._load else cast(list[T], results)
+
+    async def one(self, **values: Any) -> T:
+        if self._one_statement is None:
+            self._one_statement = self._prepare(1)
+        with self.database._audit("select_one", table=self.table.name, prepared=True) as event:
+            parameters = self._bind(self._one_statement, values)
+            async with self.database._read_connection():
+                async with self.database.execute(self._one_statement.statement, parameters) as cursor:
+                    row = cursor.first()
+                    if row is None:
+                        raise DoesNotExistError(self._does_not_exist(values))
+                    result = self.database._row_deserializer(self._one_statement.statement, cursor.keys())(row)
+            event.set(row=result)
+        if self._load:
+            [model] = await self._load([result])
+            return model
+        return cast(T, result)
+
+    def _prepare(self, limit: int | None) -> CachedStatement:
+        return CachedStatement(self._build(limit), {name: name for name in self.parameters})
+
+    def _bind(self, statement: CachedStatement, values: dict[str, Any]) -> dict[str, Any]:
+        if set(values) != set(self.parameters):
+            raise ValueError(
+                f"invalid parameters {and_(values)} for {self} (expected parameters are {and_(self.parameters)})"
+            )
+        return statement.bind(values)
+
+    def _does_not_exist(self, values: dict[str, Any]) -> str:
+        if not self.condition:
+            return f"no {self.table.plural} exist"
+        message = f"{self.table.name} with {self.condition} doesn't exist"
+        if values:
+            message += f" ({", ".join(f"{name}={value!r}" for name, value in values.items())})"
+        return message
@@ -5,12 +5,14 @@ from functools import reduce
 from operator import and_, or_
 from typing import TYPE_CHECKING, Any
 
-from sqlalchemy import ColumnElement
+from sqlalchemy import BindParameter, ColumnElement, bindparam
+from sqlalchemy.types import NullType
 
 from tunqi.core.expression import Expression
 from tunqi.core.functions_ import functions
 from tunqi.core.join import Joins, merge_joins
 from tunqi.core.selector import Selector
+from tunqi.core.statement_cache import BINDABLE_FUNCTIONS
 
 if TYPE_CHECKING:  # pragma: no cover
     from tunqi.core.table import Table
@@ -63,6 +65,16 @@ class Query:
             return NotImplemented
         return type(self)(self, other, operator="and")
 
+    def parameters(self) -> list[str]:
+        names: list[str] = []
+        for operand in self.operands:
+            if isinstance(operand, Query):
+                operand_names = operand.parameters()
+            else:
+                operand_names = [value.name for value in operand.values() if isinstance(value, Param)]
+            names.extend(name for name in operand_names if name not in names)
+        return names
+
     def resolve(self, table: Table) -> tuple[ColumnElement, Joins]:
         clauses: list[ColumnElement] = []
         all_joins: list[Joins] = []
@@ -84,7 +96,7 @@ class Query:
 
     def _format_filter(self, key: str, value: Any) -> str:
         key = key.replace("__", ".")
-        if isinstance(value, Expression):
+        if isinstance(value, Expression | Param):
             value = str(value)
         else:
             value = repr(value)
@@ -99,6 +111,8 @@ class Query:
         key = key.replace("__", ".")
         if "." not in key:
             selector = Selector.from_column(table, key)
+            if isinstance(value, Param):
+                value = value.bind()
             return selector.clause == value, selector.joins
         selector_name, function_name = key.rsplit(".", 1)
         if function_name in functions and functions[function_name].min_args == 2:
@@ -106,6 +120,12 @@ class Query:
         else:
             function = functions["eq"]
             selector_name = key
+        if isinstance(value, Param):
+            if function.name not in BINDABLE_FUNCTIONS:
+                raise ValueError(
+                    f"can't use parameter {value.name!r} in {key!r} ({function.name} can't be parameterized)"
+                )
+            value = value.bind(expanding=function.name in ("in", "not_in"))
         selector = Selector.create(table, selector_name)[0]
         joins = selector.joins
         if isinstance(value, dt.datetime):
@@ -117,7 +137,8 @@ class Query:
             return function(selector, value), joins
         if function.name == "ne":
             function = functions["distinct_from"]
-        selector.json_as(type(value))
+        # Bound parameters (e.g. in cached statements) still carry a sample value to infer the JSON type from.
+        selector.json_as(type(value.value) if isinstance(value, BindParameter) else type(value))
         clause = function(selector, value)
         if selector.column is not None and function.name != "has":
             column = Selector.from_column(table, selector.column.name)
@@ -125,5 +146,28 @@ class Query:
         return clause, joins
 
 
+class Param:
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __str__(self) -> str:
+        return f":{self.name}"
+
+    def __repr__(self) -> str:
+        return f"<parameter {self.name!r}>"
+
+    def bind(self, expanding: bool = False) -> BindParameter:
+        # Like the statement cache's parameters, its type is left null so that it assumes the type of the column it's
+        # compared to.
+        return bindparam(self.name, type_=NullType(), expanding=expanding)
+
+
 def q(operator: str = "and", /, **filter: Any) -> Query:
     return Query(filter, operator=operator)
+
+
+def param(name: str) -> Param:
+    return Param(name)
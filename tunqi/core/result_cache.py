@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any
+
+MISSING: Any = object()
+
+
+class ResultCache(ABC):
+
+    def __str__(self) -> str:
+        return type(self).__name__
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Any:
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def invalidate(self, namespace: str) -> None:
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass  # pragma: no cover
+
+
+class MemoryCache(ResultCache):
+
+    def __init__(self, size: int = 1024, ttl: float | None = None) -> None:
+        if size < 1:
+            raise ValueError(f"invalid cache size {size!r} (expected a positive integer)")
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: collections.OrderedDict[tuple[str, str], tuple[float | None, Any]] = collections.OrderedDict()
+        self._namespaces: dict[str, set[str]] = collections.defaultdict(set)
+        # Synchronous databases might be used (and cached) from multiple threads.
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"memory cache ({len(self)}/{self.size}, {self.hits} hits, {self.misses} misses)"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expiration, value = entry
+            if expiration is not None and expiration < time.monotonic():
+                self._remove(namespace, key)
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        expiration = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[namespace, key] = expiration, value
+            self._entries.move_to_end((namespace, key))
+            self._namespaces[namespace].add(key)
+            while len(self._entries) > self.size:
+                (namespace, key), _ = self._entries.popitem(last=False)
+                self._namespaces[namespace].discard(key)
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            for key in self._namespaces.pop(namespace, set()):
+                self._entries.pop((namespace, key), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _remove(self, namespace: str, key: str) -> None:
+        del self._entries[namespace, key]
+        self._namespaces[namespace].discard(key)
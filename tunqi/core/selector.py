@@ -16,6 +16,8 @@ if TYPE_CHECKING:  # pragma: no cover
 
 type SelectorTypes = bool | str | Expression | Iterable[str | Expression] | None
 
+SELECTOR_CACHE_SIZE = 1024
+
 
 class Selector:
 
@@ -71,14 +73,30 @@ class Selector:
 
     @classmethod
     def from_column(cls, table: Table, name: str) -> Selector:
-        columns = {column.name: column for column in table.table.columns}
-        if name not in columns:
-            raise ValueError(f"{table} has no column {name!r} (available columns are {and_(columns)})")
-        column = columns[name]
+        if name not in table.columns:
+            raise ValueError(f"{table} has no column {name!r} (available columns are {and_(table.columns)})")
+        column = table.columns[name]
         return cls(table, name, column, column=column)
 
     @classmethod
     def create(cls, table: Table, selector: str) -> list[Selector]:
+        # Resolving a selector (parsing it, traversing its relations and building its JSON path) is the same every time,
+        # so tables keep the resolved selectors, and return copies of them (since they might be modified later).
+        cache = table._selector_cache
+        if selector not in cache:
+            if len(cache) >= SELECTOR_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            cache[selector] = cls._create(table, selector)
+        return [cached.copy() for cached in cache[selector]]
+
+    def copy(self) -> Selector:
+        joins = {table: list(related_tables) for table, related_tables in self.joins.items()}
+        return Selector(
+            self.table, self.selector, self.clause, joins, self.alias, self.desc, self.column, self.json_path
+        )
+
+    @classmethod
+    def _create(cls, table: Table, selector: str) -> list[Selector]:
         selector, alias, desc = cls.parse_alias_and_order(selector)
         segments = selector.split(".")
         table, joins = cls._traverse_joins(table, segments)
@@ -118,10 +136,10 @@ class Selector:
     @classmethod
     def _traverse_path(cls, table: Table, segments: list[str]) -> tuple[ColumnElement, Column, str | None]:
         column_name = segments.pop(0)
-        if column_name not in table.table.columns:
+        if column_name not in table.columns:
             selectors = table._available_selectors()
             raise ValueError(f"{table} has no column {column_name!r} (available selectors are {and_(selectors)})")
-        column = table.table.columns[column_name]
+        column = table.columns[column_name]
         if not segments:
             return column, column, None
         clause = cls._traverse_functions(table, segments, column)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import collections
+import datetime as dt
+from typing import TYPE_CHECKING, Any, Callable, Hashable
+
+from sqlalchemy import BindParameter, Executable, Integer, bindparam
+from sqlalchemy.types import NullType
+
+from tunqi.core.functions_ import functions
+
+if TYPE_CHECKING:  # pragma: no cover
+    from tunqi.core.table import Table
+
+type StatementKey = tuple[Hashable, ...]
+type StatementBuilder = Callable[[dict[str, Any], BindParameter | None, BindParameter | None], Executable]
+
+# Functions whose value is passed as-is to a SQLAlchemy operator, so it can be replaced with a bound parameter without
+# changing the shape of the statement (unlike, say, has, whose value is baked into a JSON path).
+BINDABLE_FUNCTIONS = {
+    "eq",
+    "ne",
+    "distinct_from",
+    "gt",
+    "lt",
+    "ge",
+    "le",
+    "in",
+    "not_in",
+    "startswith",
+    "endswith",
+    "like",
+    "not_like",
+    "matches",
+}
+SCALAR_TYPES = bool, int, float, str, bytes, dt.datetime
+LIMIT = "limit"
+OFFSET = "offset"
+
+
+class CachedStatement:
+
+    __slots__ = "statement", "parameters"
+
+    def __init__(self, statement: Executable, parameters: dict[str, str]) -> None:
+        self.statement = statement
+        self.parameters = parameters
+
+    def bind(self, query: dict[str, Any], limit: int | None = None, offset: int | None = None) -> dict[str, Any]:
+        values: dict[str, Any] = {}
+        for key, name in self.parameters.items():
+            value = query[key]
+            if isinstance(value, dt.datetime):
+                value = value.astimezone(dt.UTC)
+            elif isinstance(value, tuple | set | frozenset):
+                value = list(value)
+            values[name] = value
+        if limit:
+            values[LIMIT] = limit
+        if offset:
+            values[OFFSET] = offset
+        return values
+
+
+class StatementCache:
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._statements: collections.OrderedDict[StatementKey, CachedStatement] = collections.OrderedDict()
+
+    def __str__(self) -> str:
+        return f"statement cache ({len(self)}/{self.size}, {self.hits} hits, {self.misses} misses)"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    @classmethod
+    def key(
+        cls,
+        operation: str,
+        table: Table,
+        fields: Any = None,
+        where: Any = None,
+        query: dict[str, Any] | None = None,
+        order: Any = None,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> StatementKey | None:
+        # Expressions and queries can't be hashed reliably (their __eq__ builds a new expression), so statements that
+        # use them are not cached.
+        if where is not None:
+            return None
+        fields_key = cls._selectors_key(fields)
+        order_key = cls._selectors_key(order)
+        if fields_key is None or order_key is None:
+            return None
+        filters: list[tuple[str, type]] = []
+        for key, value in (query or {}).items():
+            if not cls._is_bindable(key, value):
+                return None
+            filters.append((key, type(value)))
+        return operation, table, fields_key, tuple(filters), order_key, bool(limit), bool(offset)
+
+    def get(self, key: StatementKey) -> CachedStatement | None:
+        cached = self._statements.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._statements.move_to_end(key)
+        return cached
+
+    def add(self, key: StatementKey, cached: CachedStatement) -> None:
+        self._statements[key] = cached
+        self._statements.move_to_end(key)
+        while len(self._statements) > self.size:
+            self._statements.popitem(last=False)
+
+    def build(
+        self,
+        key: StatementKey,
+        builder: StatementBuilder,
+        query: dict[str, Any],
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> CachedStatement:
+        parameters: dict[str, str] = {}
+        bound_query: dict[str, Any] = {}
+        for n, (name, value) in enumerate(query.items()):
+            parameter = f"filter_{n}"
+            parameters[name] = parameter
+            # The parameter carries the value so that type-dependent resolution (e.g. casting JSON paths) still works,
+            # but its type is left null so that it assumes the type of the column it's compared to, like a literal.
+            expanding = isinstance(value, list | tuple | set | frozenset)
+            if expanding:
+                value = list(value)
+            bound_query[name] = bindparam(parameter, value, type_=NullType(), expanding=expanding)
+        limit_ = bindparam(LIMIT, type_=Integer()) if limit else None
+        offset_ = bindparam(OFFSET, type_=Integer()) if offset else None
+        cached = CachedStatement(builder(bound_query, limit_, offset_), parameters)
+        self.add(key, cached)
+        return cached
+
+    def clear(self) -> None:
+        self._statements.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def _selectors_key(cls, selectors: Any) -> tuple[Hashable, ...] | None:
+        if selectors is None or isinstance(selectors, bool | str):
+            return (selectors,)
+        # Other iterables might be one-shot, so we don't consume them just to compute a key.
+        if not isinstance(selectors, list | tuple):
+            return None
+        if not all(isinstance(selector, str) for selector in selectors):
+            return None
+        return tuple(selectors)
+
+    @classmethod
+    def _is_bindable(cls, key: str, value: Any) -> bool:
+        if isinstance(value, list | tuple | set | frozenset):
+            return cls._filter_function(key) in ("in", "not_in") and all(
+                isinstance(item, SCALAR_TYPES) for item in value
+            )
+        return isinstance(value, SCALAR_TYPES) and cls._filter_function(key) in BINDABLE_FUNCTIONS
+
+    @classmethod
+    def _filter_function(cls, key: str) -> str:
+        # This mirrors the way Query._resolve_filter tells a function suffix from a selector.
+        key = key.replace("__", ".")
+        if "." in key:
+            _, function_name = key.rsplit(".", 1)
+            if function_name in functions and functions[function_name].min_args == 2:
+                return function_name
+        return "eq"
@@ -7,6 +7,7 @@ from typing import TYPE_CHECKING, Any, ClassVar, Iterable
 import sqlalchemy
 from sqlalchemy import (
     JSON,
+    BindParameter,
     Column,
     ColumnElement,
     Delete,
@@ -16,8 +17,10 @@ from sqlalchemy import (
     Select,
     UniqueConstraint,
     Update,
+    case,
     exists,
     func,
+    literal,
     select,
     tuple_,
 )
@@ -30,16 +33,18 @@ from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from tunqi.core.column import create_column
 from tunqi.core.condition import Condition
-from tunqi.core.selector import Selectors
+from tunqi.core.selector import Selector, Selectors
 from tunqi.utils import and_, pluralize
 
 if TYPE_CHECKING:  # pragma: no cover
     from tunqi.core.database import Database
 
 type Row = dict[str, Any]
+type Columns = dict[str, Any]
 type Relations = dict[str, list[Table]]
 
 ROW_NUMBER = "__row_number__"
+SORT_KEY = "__sort_key_{}__"
 
 
 class Table:
@@ -53,6 +58,7 @@ class Table:
         self.plural: str = schema["plural"] if "plural" in schema else pluralize(name)
         self.unique: list[tuple[str, ...]] = schema["unique"] if "unique" in schema else []
         self.table, self.pk = self._create_table()
+        self._selector_cache: dict[str, list[Selector]] = {}
 
     def __str__(self) -> str:
         return f"table {self.name!r}"
@@ -60,6 +66,10 @@ class Table:
     def __repr__(self) -> str:
         return f"<{self}>"
 
+    @cached_property
+    def columns(self) -> dict[str, Column]:
+        return {column.name: column for column in self.table.columns}
+
     @cached_property
     def relations(self) -> Relations:
         relations: Relations = {}
@@ -114,6 +124,18 @@ class Table:
         subquery = self._change_subquery(condition)
         return self.table.update().where(self.pk.in_(subquery))
 
+    def bulk_update(self, rows: list[Row]) -> Update:
+        # Each column is set to a CASE over the PKs of the rows that change it, and to itself for the rest, so that rows
+        # with different changes can be updated by a single statement.
+        pks = [row[self.pk_name] for row in rows]
+        column_names = {name: None for row in rows for name in row if name != self.pk_name}
+        values: dict[str, ColumnElement] = {}
+        for column_name in column_names:
+            column = Selector.from_column(self, column_name).clause
+            cases = {row[self.pk_name]: literal(row[column_name], column.type) for row in rows if column_name in row}
+            values[column_name] = case(cases, value=self.pk, else_=column)
+        return self.table.update().where(self.pk.in_(pks)).values(values)
+
     def delete(self, condition: Condition) -> Delete:
         if not condition:
             return self.table.delete()
@@ -126,9 +148,10 @@ class Table:
         self,
         selectors: Selectors,
         condition: Condition,
-        limit: int | None = None,
-        offset: int | None = None,
+        limit: int | BindParameter | None = None,
+        offset: int | BindParameter | None = None,
         order: Selectors | None = None,
+        seek: list[Any] | None = None,
     ) -> Select:
         if selectors:
             statement = select(*selectors.select_terms())
@@ -145,22 +168,33 @@ class Table:
             if condition:
                 statement = statement.where(condition.clause)
             if order:
+                sort_keys: list[ColumnElement] = []
                 sort_terms: list[ColumnElement] = []
                 for selector in order.selectors:
+                    sort_key: ColumnElement
                     if selector.desc:
-                        sort_term = func.max(selector.clause).label(selector.alias).desc()
+                        sort_key = func.max(selector.clause)
+                        sort_term = sort_key.label(selector.alias).desc()
                     else:
-                        sort_term = func.min(selector.clause).label(selector.alias).asc()
+                        sort_key = func.min(selector.clause)
+                        sort_term = sort_key.label(selector.alias).asc()
+                    sort_keys.append(sort_key)
                     sort_terms.append(sort_term)
                 statement = statement.order_by(*sort_terms)
+                # Since the rows are grouped, the seek predicate has to apply to the aggregated sort keys.
+                if seek is not None:
+                    statement = self._seek(statement, order, sort_keys, seek, having=True)
         else:
             if condition:
                 statement = statement.where(condition.clause)
             if order:
                 statement = statement.order_by(*order.sort_terms())
-        if limit:
+                if seek is not None:
+                    statement = self._seek(statement, order, order.clauses, seek, having=False)
+        # Limit and offset might be bound parameters (e.g. in cached statements), which don't support truthiness checks.
+        if isinstance(limit, BindParameter) or limit:
             statement = statement.limit(limit)
-        if offset:
+        if isinstance(offset, BindParameter) or offset:
             statement = statement.offset(offset)
         return statement
 
@@ -195,6 +229,71 @@ class Table:
         statement = link_table.table.delete().where(tuple_(*columns).in_(pks))
         return statement
 
+    def select_links(self, m2m_name: str, targets: Iterable[int]) -> Select:
+        if m2m_name not in self.database._m2ms[self.name]:
+            raise ValueError(
+                f"table {self.name!r} has no many-to-many relation {m2m_name!r} "
+                f"(available many-to-many relations are {and_(self.database._m2ms[self.name])})"
+            )
+        target_table_name, link_table_name = self.database._m2ms[self.name][m2m_name]
+        link_table = self.database._tables[link_table_name]
+        source_column = link_table.table.columns[self.name]
+        target_column = link_table.table.columns[target_table_name]
+        return select(source_column, target_column).where(target_column.in_(list(targets)))
+
+    def _seek(
+        self,
+        statement: Select,
+        order: Selectors,
+        sort_keys: list[ColumnElement],
+        values: list[Any],
+        having: bool,
+    ) -> Select:
+        # The sort keys are selected as well, so that the values to seek after can be taken from the last row.
+        statement = statement.add_columns(*(key.label(SORT_KEY.format(n)) for n, key in enumerate(sort_keys)))
+        if not values:
+            return statement
+        if len(values) != len(sort_keys):
+            raise ValueError(f"expected {len(sort_keys)} values to seek after (got {len(values)})")
+        directions = {bool(selector.desc) for selector in order.selectors}
+        nullable = any(value is None for value in values) or not all(_is_required(key) for key in sort_keys)
+        clause: ColumnElement
+        if len(directions) == 1 and not nullable:
+            # If all the keys are sorted in the same direction and can't be null, we can compare them as a row value:
+            # (a, b) > (x, y). The values are bound with the types of their keys, since SQLAlchemy refuses to compare
+            # with bare booleans.
+            [desc] = directions
+            keys, row = tuple_(*sort_keys), tuple_(*(literal(value, key.type) for key, value in zip(sort_keys, values)))
+            clause = keys < row if desc else keys > row
+        else:
+            # Otherwise, we have to expand it: a > x OR (a = x AND b < y) and so on, with each comparison accounting for
+            # nulls (which never compare as true).
+            clauses: list[ColumnElement] = []
+            for n, (selector, key, value) in enumerate(zip(order.selectors, sort_keys, values)):
+                equal = [
+                    self._seek_equal(previous_key, previous_value)
+                    for previous_key, previous_value in zip(sort_keys, values[:n])
+                ]
+                clauses.append(sqlalchemy.and_(*equal, self._seek_after(key, value, bool(selector.desc))))
+            clause = sqlalchemy.or_(*clauses)
+        return statement.having(clause) if having else statement.where(clause)
+
+    def _seek_equal(self, key: ColumnElement, value: Any) -> ColumnElement:
+        if value is None:
+            return key.is_(None)
+        return key == literal(value, key.type)
+
+    def _seek_after(self, key: ColumnElement, value: Any, desc: bool) -> ColumnElement:
+        # PostgreSQL sorts nulls as larger than any value, while SQLite and MySQL sort them as smaller, so they come
+        # either last or first, depending on the direction.
+        nulls_last = self.database.is_postgresql != desc
+        if value is None:
+            return sqlalchemy.false() if nulls_last else key.is_not(None)
+        after = key < literal(value, key.type) if desc else key > literal(value, key.type)
+        if nulls_last:
+            return sqlalchemy.or_(after, key.is_(None))
+        return after
+
     def _create_table(self) -> tuple[sqlalchemy.Table, Column]:
         columns: dict[str, Column] = {}
         pk = Column(self.pk_name, Integer(), primary_key=True, autoincrement=True)
@@ -279,3 +378,7 @@ class Table:
         fields = [column.name for column in self.table.columns]
         fields.extend(self.relations)
         return fields
+
+
+def _is_required(key: ColumnElement) -> bool:
+    return isinstance(key, Column) and not key.nullable
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import bisect
+import collections
+import math
+import threading
+from typing import Any, Iterable, Iterator
+
+from tunqi.audit import AuditEvent
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TRANSACTION_EVENTS = {"begin", "begin_nested"}
+ROW_COUNTS = ["rows", "row", "pks", "inserted", "updated", "deleted", "linked", "unlinked", "links"]
+
+type Labels = tuple[str, str | None]
+
+
+class Histogram:
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = sorted(buckets)
+        if not self.buckets:
+            raise ValueError("a histogram must have at least one bucket")
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def __str__(self) -> str:
+        return f"histogram of {self.count} observations"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> float | None:
+        if not 0 <= q <= 1:
+            raise ValueError(f"invalid quantile {q!r} (expected a number between 0 and 1)")
+        if not self.count:
+            return None
+        # Like Prometheus' histogram_quantile: find the bucket the rank falls into, and interpolate linearly within it
+        # (clamped to the observed minimum and maximum, which are more accurate than the bucket's bounds).
+        rank = q * self.count
+        cumulative = 0
+        for n, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[n - 1] if n > 0 else 0.0
+                upper = self.buckets[n] if n < len(self.buckets) else math.inf
+                lower, upper = max(lower, self.min or 0.0), min(upper, self.max or 0.0)
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+    def cumulative_counts(self) -> Iterator[tuple[float, int]]:
+        cumulative = 0
+        for bucket, count in zip([*self.buckets, math.inf], self.counts):
+            cumulative += count
+            yield bucket, cumulative
+
+
+class Metrics:
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.latencies: dict[Labels, Histogram] = {}
+        self.rows: dict[Labels, int] = collections.defaultdict(int)
+        self.errors: dict[Labels, int] = collections.defaultdict(int)
+        self.checkouts = Histogram(self.buckets)
+        self.transactions = Histogram(self.buckets)
+        # Synchronous databases might be used (and audited) from multiple threads.
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"metrics of {sum(histogram.count for histogram in self.latencies.values())} events"
+
+    def __repr__(self) -> str:
+        return f"<{self}>"
+
+    def __call__(self, event: AuditEvent) -> None:
+        with self._lock:
+            self._record(event)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latencies.clear()
+            self.rows.clear()
+            self.errors.clear()
+            self.checkouts = Histogram(self.buckets)
+            self.transactions = Histogram(self.buckets)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            operations: list[dict[str, Any]] = []
+            for (operation, table), histogram in sorted(self.latencies.items(), key=_sort_key):
+                operations.append(
+                    {
+                        "operation": operation,
+                        "table": table,
+                        "rows": self.rows.get((operation, table), 0),
+                        "errors": self.errors.get((operation, table), 0),
+                        **histogram.snapshot(),
+                    }
+                )
+            return {
+                "operations": operations,
+                "checkouts": self.checkouts.snapshot(),
+                "transactions": self.transactions.snapshot(),
+            }
+
+    def to_prometheus(self, prefix: str = "tunqi") -> str:
+        lines: list[str] = []
+        with self._lock:
+            lines.append(f"# HELP {prefix}_operation_duration_seconds The duration of database operations.")
+            lines.append(f"# TYPE {prefix}_operation_duration_seconds histogram")
+            for (operation, table), histogram in sorted(self.latencies.items(), key=_sort_key):
+                name = f"{prefix}_operation_duration_seconds"
+                lines.extend(_format_histogram(name, histogram, operation=operation, table=table))
+            lines.append(f"# HELP {prefix}_operation_rows_total The number of rows affected by database operations.")
+            lines.append(f"# TYPE {prefix}_operation_rows_total counter")
+            for (operation, table), rows in sorted(self.rows.items(), key=_sort_key):
+                labels = _format_labels(operation=operation, table=table)
+                lines.append(f"{prefix}_operation_rows_total{labels} {rows}")
+            lines.append(f"# HELP {prefix}_operation_errors_total The number of failed database operations.")
+            lines.append(f"# TYPE {prefix}_operation_errors_total counter")
+            for (operation, table), errors in sorted(self.errors.items(), key=_sort_key):
+                labels = _format_labels(operation=operation, table=table)
+                lines.append(f"{prefix}_operation_errors_total{labels} {errors}")
+            lines.append(f"# HELP {prefix}_connection_checkout_seconds The time it takes to check out a connection.")
+            lines.append(f"# TYPE {prefix}_connection_checkout_seconds histogram")
+            lines.extend(_format_histogram(f"{prefix}_connection_checkout_seconds", self.checkouts))
+            lines.append(f"# HELP {prefix}_transaction_duration_seconds The duration of transactions.")
+            lines.append(f"# TYPE {prefix}_transaction_duration_seconds histogram")
+            lines.extend(_format_histogram(f"{prefix}_transaction_duration_seconds", self.transactions))
+        return "\n".join(lines) + "\n"
+
+    def _record(self, event: AuditEvent) -> None:
+        labels = event.name, event.data.get("table")
+        if labels not in self.latencies:
+            self.latencies[labels] = Histogram(self.buckets)
+        self.latencies[labels].observe(event.duration)
+        if event.error:
+            self.errors[labels] += 1
+        rows = _count_rows(event)
+        if rows is not None:
+            self.rows[labels] += rows
+        if event.name == "checkout":
+            self.checkouts.observe(event.duration)
+        if event.name in TRANSACTION_EVENTS:
+            self.transactions.observe(event.duration)
+        for child in event.children:
+            self._record(child)
+
+
+def _count_rows(event: AuditEvent) -> int | None:
+    for key in ROW_COUNTS:
+        if key not in event.data:
+            continue
+        value = event.data[key]
+        if key == "row":
+            return int(value is not None)
+        if isinstance(value, list):
+            return len(value)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _sort_key(item: tuple[Labels, Any]) -> tuple[str, str]:
+    (operation, table), _ = item
+    return operation, table or ""
+
+
+def _format_histogram(name: str, histogram: Histogram, **labels: str | None) -> list[str]:
+    lines: list[str] = []
+    for bucket, count in histogram.cumulative_counts():
+        le = "+Inf" if bucket == math.inf else repr(bucket)
+        lines.append(f"{name}_bucket{_format_labels(**labels, le=le)} {count}")
+    lines.append(f"{name}_sum{_format_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_format_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def _format_labels(**labels: str | None) -> str:
+    values = [f'{name}="{_escape(value)}"' for name, value in labels.items() if value is not None]
+    if not values:
+        return ""
+    return "{" + ",".join(values) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
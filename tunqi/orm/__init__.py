@@ -1,3 +1,4 @@
+from ..core.identity_map import IdentityMap
 from .annotations import PK, Index, Unique, length
 from .backref import Backref
 from .fk import FK, OptionalFK
@@ -15,5 +16,6 @@ __all__ = [
     "OptionalFK",
     "Backref",
     "M2M",
+    "IdentityMap",
     "unique",
 ]
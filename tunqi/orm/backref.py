@@ -112,9 +112,32 @@ class BoundBackref[S: Model, T: Model]:
         order: Iterable[str] | None = None,
         **query: Any,
     ) -> list[T]:
+        # If the relation was prefetched, an unfiltered query is served from its cache.
+        prefetched = self.source._prefetched.get(self.backref.name)
+        if (
+            prefetched is not None
+            and where is None
+            and limit is None
+            and offset is None
+            and order is None
+            and not query
+        ):
+            return list(prefetched)
         query[self.backref.to] = self._assert_saved()
         return await self.model.all(where=where, limit=limit, offset=offset, order=order, **query)
 
+    async def page(
+        self,
+        /,
+        where: Expression | Query | None = None,
+        order: Iterable[str] | None = None,
+        cursor: str | None = None,
+        size: int = 100,
+        **query: Any,
+    ) -> tuple[list[T], str | None]:
+        query[self.backref.to] = self._assert_saved()
+        return await self.model.page(where=where, order=order, cursor=cursor, size=size, **query)
+
     async def all_fields(
         self,
         /,
@@ -131,6 +154,7 @@ class BoundBackref[S: Model, T: Model]:
 
     async def create(self, *models: T) -> list[int]:
         pk = self._assert_saved()
+        self._invalidate()
         fks: list[BoundFK[S, T]] = []
         fk_pks: list[int | None] = []
         for model in models:
@@ -153,12 +177,17 @@ class BoundBackref[S: Model, T: Model]:
         **query: Any,
     ) -> Callable[..., Awaitable[int]]:
         query[self.backref.to] = self._assert_saved()
+        self._invalidate()
         return self.model.update(*targets, where=where, **query)
 
     async def delete(self, *targets: int | T | None, where: Expression | Query | None = None, **query: Any) -> int:
         query[self.backref.to] = self._assert_saved()
+        self._invalidate()
         return await self.model.delete_all(*targets, where=where, **query)
 
+    def _invalidate(self) -> None:
+        self.source._prefetched.pop(self.backref.name, None)
+
     def _assert_saved(self) -> int:
         if not self.source.pk:
             raise RuntimeError(f"can't operate on a {self} of the unsaved {self.source}")
@@ -104,9 +104,32 @@ class BoundM2M[S: Model, T: Model]:
         order: Iterable[str] | None = None,
         **query: Any,
     ) -> list[T]:
+        # If the relation was prefetched, an unfiltered query is served from its cache.
+        prefetched = self.source._prefetched.get(self.m2m.name)
+        if (
+            prefetched is not None
+            and where is None
+            and limit is None
+            and offset is None
+            and order is None
+            and not query
+        ):
+            return list(prefetched)
         query[self._link] = self._assert_saved()
         return await self.model.all(where=where, limit=limit, offset=offset, order=order, **query)
 
+    async def page(
+        self,
+        /,
+        where: Expression | Query | None = None,
+        order: Iterable[str] | None = None,
+        cursor: str | None = None,
+        size: int = 100,
+        **query: Any,
+    ) -> tuple[list[T], str | None]:
+        query[self._link] = self._assert_saved()
+        return await self.model.page(where=where, order=order, cursor=cursor, size=size, **query)
+
     async def all_fields(
         self,
         /,
@@ -124,6 +147,7 @@ class BoundM2M[S: Model, T: Model]:
     async def add(self, *models: T) -> int:
         source_pk = self._assert_saved()
         target_pks = self._assert_models(models)
+        self._invalidate()
         return await self.source._config.database.link(
             self.model._config.table_name, self.m2m.to, target_pks, [source_pk]
         )
@@ -131,6 +155,7 @@ class BoundM2M[S: Model, T: Model]:
     async def remove(self, *models: T) -> int:
         source_pk = self._assert_saved()
         target_pks = self._assert_models(models)
+        self._invalidate()
         return await self.source._config.database.unlink(
             self.model._config.table_name, self.m2m.to, target_pks, [source_pk]
         )
@@ -139,6 +164,9 @@ class BoundM2M[S: Model, T: Model]:
     def _link(self) -> str:
         return f"{self.m2m.to}__{Table.pk_name}"
 
+    def _invalidate(self) -> None:
+        self.source._prefetched.pop(self.m2m.name, None)
+
     def _assert_saved(self) -> int:
         if not self.source.pk:
             raise RuntimeError(f"can't operate on a {self} of the unsaved {self.source}")
@@ -2,16 +2,20 @@ from ..audit import AuditEvent, Auditor
 from ..core.condition import Condition
 from ..core.expression import Expression, c
 from ..core.functions_ import function, functions
-from ..core.query import Query, q
+from ..core.query import Query, param, q
+from ..core.result_cache import MemoryCache, ResultCache
 from ..core.selector import Selector, Selectors
 from ..core.table import Row, Table
 from ..errors import AlreadyExistsError, DoesNotExistError, Error
-from ..orm import PK, Index, Unique, length, unique
+from ..metrics import Metrics
+from ..orm import PK, IdentityMap, Index, Unique, length, unique
 from .backref import Backref
+from .batch import Batch
 from .database import Database
 from .fk import FK, OptionalFK
 from .m2m import M2M
 from .model import Model
+from .prepared import PreparedQuery
 
 __all__ = [
     "AlreadyExistsError",
@@ -26,11 +30,17 @@ __all__ = [
     "c",
     "Query",
     "q",
+    "param",
+    "PreparedQuery",
+    "Batch",
     "Condition",
     "function",
     "functions",
+    "ResultCache",
+    "MemoryCache",
     "Auditor",
     "AuditEvent",
+    "Metrics",
     "Model",
     "PK",
     "Unique",
@@ -39,6 +49,7 @@ __all__ = [
     "OptionalFK",
     "Backref",
     "M2M",
+    "IdentityMap",
     "unique",
     "length",
 ]
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import base64
 import collections
 import datetime as dt
+import importlib.util
+import itertools
 import json
+import logging
 import pathlib
 import re
 import sqlite3
+import time
 import uuid
-from contextlib import contextmanager, suppress
+from contextlib import (
+    ExitStack,
+    contextmanager,
+    nullcontext,
+    suppress,
+)
 from contextvars import ContextVar, Token
 from typing import (
     Any,
@@ -17,16 +27,25 @@ from typing import (
     Iterable,
     Iterator,
     Mapping,
+    Sequence,
     cast,
     overload,
 )
 
 from sqlalchemy import (
+    JSON,
+    Boolean,
     ClauseElement,
     Connection,
     CursorResult,
+    DateTime,
+    Engine,
     Executable,
+    Float,
+    Integer,
+    LargeBinary,
     MetaData,
+    String,
     Transaction,
     Update,
     create_engine,
@@ -34,18 +53,27 @@ from sqlalchemy import (
     make_url,
     text,
 )
+from sqlalchemy.engine import Row as ResultRow
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.sql.compiler import SQLCompiler
 from srlz import Serialization
 
-from tunqi.audit import AuditEvent, AuditEventBase, Auditor
+from tunqi.audit import AuditEvent, AuditEventBase, Auditor, UnsampledAuditEvent
+from tunqi.core.concurrency import gather
 from tunqi.core.condition import Condition
+from tunqi.core.copy_stream import CopyStream
 from tunqi.core.expression import Expression
+from tunqi.core.identity_map import IdentityMap
 from tunqi.core.migration import Migration
 from tunqi.core.query import Query
-from tunqi.core.selector import Selectors, SelectorTypes
-from tunqi.core.table import Row, Table
+from tunqi.core.result_cache import ResultCache
+from tunqi.core.selector import Selector, Selectors, SelectorTypes
+from tunqi.core.statement_cache import StatementCache
+from tunqi.core.table import SORT_KEY, Columns, Row, Table
 from tunqi.errors import AlreadyExistsError, DoesNotExistError
+from tunqi.sync.batch import Batch
+from tunqi.sync.prepared import Loader, PreparedQuery
 from tunqi.utils import and_
 
 SQLITE_PARAMETER = re.compile(r"\?")
@@ -54,6 +82,16 @@ MYSQL_PARAMETER = re.compile(r"%s")
 SQLITE_UNIQUE_ERROR = re.compile(r"UNIQUE constraint failed: (.*)")
 POSTGRESQL_UNIQUE_ERROR = re.compile(r"DETAIL:\s*Key \((.*)\)=\((.*)\) already exists")
 MYSQL_UNIQUE_ERROR = re.compile(r"Duplicate entry '(.*)' for key '(.*)'")
+# SQLite's default limit was raised from 999 in version 3.32, and psycopg2 encodes the number of parameters in 16 bits.
+SQLITE_MAX_PARAMETERS = 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999
+POSTGRESQL_MAX_PARAMETERS = 32767
+MYSQL_MAX_PARAMETERS = 65535
+
+REPLICA_ROUTINGS = ["round_robin", "least_busy"]
+# The values of columns of these types are returned by the driver as they are, so they're not deserialized.
+SCALAR_TYPES = Boolean, Integer, Float, String, LargeBinary
+
+logger = logging.getLogger("tunqi")
 
 
 class Database:
@@ -63,6 +101,8 @@ class Database:
     active_database: ClassVar[ContextVar[Database | None]] = ContextVar("active_database", default=None)
     active_connection: ClassVar[ContextVar[Connection | None]] = ContextVar("active_connection", default=None)
     active_transaction: ClassVar[ContextVar[Transaction | None]] = ContextVar("active_transaction", default=None)
+    primary_reads: ClassVar[ContextVar[bool]] = ContextVar("primary_reads", default=False)
+    written_tables: ClassVar[ContextVar[set[str] | None]] = ContextVar("written_tables", default=None)
 
     def __init__(
         self,
@@ -71,22 +111,68 @@ class Database:
         default: bool = False,
         serialization: Serialization | None = None,
         auditor: Auditor | None = None,
+        audit_sampling: int = 1,
+        slow_query_threshold: float | None = None,
+        statement_cache_size: int = 256,
+        pool_size: int | None = None,
+        max_overflow: int | None = None,
+        pool_timeout: float | None = None,
+        pool_recycle: int | None = None,
+        pool_pre_ping: bool = False,
+        replicas: Iterable[str] | None = None,
+        replica_routing: str = "round_robin",
     ) -> None:
+        if audit_sampling < 1:
+            raise ValueError(f"invalid audit sampling {audit_sampling!r} (expected a positive integer)")
+        if replica_routing not in REPLICA_ROUTINGS:
+            raise ValueError(
+                f"invalid replica routing {replica_routing!r} (available routings are {and_(REPLICA_ROUTINGS)})"
+            )
         if serialization is None:
             serialization = self.default_serialization
         self.serialization = serialization
         self.url = make_url(url).render_as_string(hide_password=True)
-        self.engine = create_engine(self._url_with_driver(url))
+        # Only the options that were provided are passed, since not all pools support them (e.g. SQLite's in-memory
+        # database uses a static pool of a single connection).
+        pool_options = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping or None,
+        }
+        engine_options = {key: value for key, value in pool_options.items() if value is not None}
+        self.engine = create_engine(self._url_with_driver(url), **engine_options)
+        self.replicas: list[Engine] = []
+        for replica_url in replicas or []:
+            if replica_url.split("://", 1)[0] != url.split("://", 1)[0]:
+                replica = make_url(replica_url).render_as_string(hide_password=True)
+                raise ValueError(f"replica {replica!r} doesn't use the same dialect as {self}")
+            self.replicas.append(create_engine(self._url_with_driver(replica_url), **engine_options))
+        self.replica_routing = replica_routing
         if self.is_sqlite:
-            event.listens_for(self.engine, "connect")(self._configure_sqlite)
+            for engine in [self.engine, *self.replicas]:
+                event.listens_for(engine, "connect")(self._configure_sqlite)
         self.metadata = MetaData()
         self.auditor = auditor
+        self.audit_sampling = audit_sampling
+        self.slow_query_threshold = slow_query_threshold
+        self.statement_cache = StatementCache(statement_cache_size)
+        self.result_caches: dict[str, ResultCache] = {}
         self._tables: dict[str, Table] = {}
         self._fks: dict[str, dict[str, str]] = collections.defaultdict(dict)
         self._m2ms: dict[str, dict[str, tuple[str, str]]] = collections.defaultdict(dict)
         self._ignored_tables: set[str] = set()
         self._ignored_relations: dict[str, set[str]] = collections.defaultdict(set)
         self._token: Token[Database | None] | None = None
+        self._audit_counter = itertools.count()
+        self._replica_counter = itertools.count()
+        # Each engine (the primary and every replica) has a pool of its own, so checkouts are counted per engine.
+        self._checked_out: dict[Engine, int] = collections.defaultdict(int)
+        self._checkouts: dict[Engine, int] = collections.defaultdict(int)
+        self._checkout_wait_time: dict[Engine, float] = collections.defaultdict(float)
+        self._max_checkout_wait_time: dict[Engine, float] = collections.defaultdict(float)
+        self._auto_increment: tuple[int, int] | None = None
         if default:
             self.set_default()
 
@@ -115,6 +201,20 @@ class Database:
     def is_mysql(self) -> bool:
         return self.url.startswith("mysql")
 
+    @property
+    def max_parameters(self) -> int:
+        if self.is_sqlite:
+            return SQLITE_MAX_PARAMETERS
+        if self.is_postgresql:
+            return POSTGRESQL_MAX_PARAMETERS
+        return MYSQL_MAX_PARAMETERS
+
+    def chunk_values[T](self, values: Sequence[T]) -> list[list[T]]:
+        # Half of the parameters are left for the rest of the statement (e.g. the model's own query), so that an IN
+        # list of each chunk's values is safe to use.
+        size = max(self.max_parameters // 2, 1)
+        return [list(values[offset : offset + size]) for offset in range(0, len(values), size)]
+
     @classmethod
     def get(cls) -> Database:
         current = cls.active_database.get()
@@ -159,13 +259,7 @@ class Database:
         return [self.serialize(item) for item in data]
 
     def deserialize(self, data: Row) -> Row:
-        deserialized = {}
-        for key, value in data.items():
-            if isinstance(value, dt.datetime):
-                deserialized[key] = value.replace(tzinfo=dt.UTC).astimezone()
-            else:
-                deserialized[key] = self.serialization.deserialize(value)
-        return deserialized
+        return {key: self._deserialize_value(value) for key, value in data.items()}
 
     def get_table(self, name: str) -> Table:
         if name not in self._tables:
@@ -226,10 +320,44 @@ class Database:
         with self.engine.connect() as connection:
             migration.migrate(connection)
 
+    def pool_stats(self) -> dict[str, Any]:
+        # The top-level stats are the primary's, and each replica's pool is reported separately, so they add up.
+        return {
+            **self._engine_pool_stats(self.engine),
+            "replicas": [self._engine_pool_stats(replica) for replica in self.replicas],
+        }
+
+    def _engine_pool_stats(self, engine: Engine) -> dict[str, Any]:
+        pool = engine.pool
+        checkouts = self._checkouts[engine]
+        wait_time = self._checkout_wait_time[engine]
+        return {
+            "pool": type(pool).__name__,
+            "size": pool.size() if isinstance(pool, QueuePool) else None,
+            "checked_out": self._checked_out[engine],
+            "idle": pool.checkedin() if isinstance(pool, QueuePool) else None,
+            "overflow": self._pool_overflow(engine),
+            "checkouts": checkouts,
+            "wait_time": wait_time,
+            "max_wait_time": self._max_checkout_wait_time[engine],
+            "mean_wait_time": wait_time / checkouts if checkouts else None,
+        }
+
+    def set_result_cache(self, table_name: str, cache: ResultCache | None) -> None:
+        if cache is None:
+            self.result_caches.pop(table_name, None)
+        else:
+            self.result_caches[table_name] = cache
+
+    def result_cache_namespace(self, table_name: str) -> str:
+        return f"{self.url}/{table_name}"
+
     def stop(self) -> None:
         with self._audit("stop"):
             self.clear_default()
             self.engine.dispose()
+            for replica in self.replicas:
+                replica.dispose()
 
     @contextmanager
     def connection(self) -> Iterator[Connection]:
@@ -239,14 +367,16 @@ class Database:
             yield connection
             return
         # Otherwise, we create a new connection and store it for nested calls.
-        with self._audit("connect") as event:
-            with self.engine.connect() as connection:
-                event.set(connection_id=id(connection), connection_uid=str(uuid.uuid4()))
-                token = self.active_connection.set(connection)
-                try:
-                    yield connection
-                finally:
-                    self.active_connection.reset(token)
+        with self._connect(self.engine) as connection:
+            yield connection
+
+    @contextmanager
+    def primary(self) -> Iterator[None]:
+        token = self.primary_reads.set(True)
+        try:
+            yield
+        finally:
+            self.primary_reads.reset(token)
 
     @contextmanager
     def transaction(self, nested: bool = False) -> Iterator[Transaction]:
@@ -290,18 +420,79 @@ class Database:
                 if isinstance(statement, str):
                     statement = text(statement)
                 event.set_statement(statement, values)
+                start = time.perf_counter()
                 cursor = connection.execute(statement, values)
+                duration = time.perf_counter() - start
+                if self.slow_query_threshold is not None and duration > self.slow_query_threshold:
+                    self._log_slow_query(event, connection, cursor, statement, values, duration)
                 yield cursor
                 if autocommit and not self.active_transaction.get():
                     with self._audit("autocommit"):
                         connection.commit()
 
+    def execute_many(
+        self,
+        statement: str | Executable,
+        rows: Iterable[Mapping[str, Any]],
+        *,
+        chunk_size: int = 1000,
+    ) -> int:
+        if chunk_size < 1:
+            raise ValueError(f"invalid chunk size {chunk_size!r} (expected a positive integer)")
+        with self._audit("execute_many") as event:
+            if isinstance(statement, str):
+                statement = text(statement)
+            count = 0
+            timings: list[float] = []
+            event.set(chunks=timings)
+            # The rows are consumed one chunk at a time, so they're never all materialized, and the chunks are executed
+            # in a transaction (which joins the active one, if any), so that they're written all or nothing.
+            with self.connection() as connection, self.transaction():
+                for chunk in itertools.batched(rows, chunk_size):
+                    with self._audit("execute") as chunk_event:
+                        chunk_event.set_statement(statement, chunk[0])
+                        start = time.perf_counter()
+                        # A list of values makes SQLAlchemy use the driver's executemany (or insertmanyvalues, for
+                        # inserts), instead of a round-trip per row.
+                        cursor = connection.execute(statement, list(chunk))
+                        timings.append(time.perf_counter() - start)
+                    # Some drivers don't report the rowcount of executemany, in which case neither do we.
+                    if count < 0 or cursor.rowcount < 0:
+                        count = -1
+                    else:
+                        count += cursor.rowcount
+            event.set(rows=count)
+            return count
+
+    def gather[T](self, *operations: T, max_concurrency: int | None = None) -> list[T]:
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(f"invalid max concurrency {max_concurrency!r} (expected a positive integer)")
+        with self._audit("gather", operations=len(operations)):
+            # In a transaction, the operations have to see its changes (and be part of it), so they share its
+            # connection, one after the other.
+            sequential = self.active_transaction.get() is not None
+            return gather(operations, max_concurrency, self._isolate_connection, sequential)
+
+    @contextmanager
+    def batch(self) -> Iterator[Batch]:
+        batch = Batch(self)
+        try:
+            yield batch
+            batch.flush()
+        finally:
+            # If the block fails, its pending queries are discarded.
+            batch.discard()
+
     def exists(self, table_name: str, *, where: Expression | Query | None = None, **query: Any) -> bool:
-        with self._audit("exists") as event:
+        with self._audit("exists", table=table_name) as event:
             table = self.get_table(table_name)
-            condition = Condition.create(table, where, **query)
-            statement = table.exists(condition)
-            with self.execute(statement) as cursor:
+
+            def build(query: dict[str, Any], *_: Any) -> Executable:
+                condition = Condition.create(table, where, **query)
+                return table.exists(condition)
+
+            statement, values = self._statement("exists", table, build, where=where, query=query)
+            with self._read_connection(), self.execute(statement, values) as cursor:
                 result = cursor.scalar() or False
                 event.set(exists=result)
                 return result
@@ -315,12 +506,16 @@ class Database:
         where: Expression | Query | None = None,
         **query: Any,
     ) -> int:
-        with self._audit("count") as event:
+        with self._audit("count", table=table_name) as event:
             table = self.get_table(table_name)
-            selectors = Selectors.resolve(table, distinct)
-            condition = Condition.create(table, where, **query)
-            statement = table.count(selectors, condition)
-            with self.execute(statement) as cursor:
+
+            def build(query: dict[str, Any], *_: Any) -> Executable:
+                selectors = Selectors.resolve(table, distinct)
+                condition = Condition.create(table, where, **query)
+                return table.count(selectors, condition)
+
+            statement, values = self._statement("count", table, build, distinct, where, query)
+            with self._read_connection(), self.execute(statement, values) as cursor:
                 result = cursor.scalar() or 0
                 event.set(count=result)
                 return result
@@ -332,16 +527,22 @@ class Database:
         on_conflict: Iterable[str] | None = None,
         update: SelectorTypes = None,
         return_pks: bool = True,
+        chunk_size: int | None = None,
     ) -> list[int]:
-        with self._audit("insert") as event:
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f"invalid chunk size {chunk_size!r} (expected a positive integer)")
+        with self._audit("insert", table=table_name) as event:
             rows_ = [self.serialize(row) for row in rows]
             table = self.get_table(table_name)
             on_conflict_ = list(on_conflict) if on_conflict else []
             update_ = Selectors.resolve(table, update, only_columns=True)
             pks: list[int] = []
-            # MySQL doesn't support RETURNING, so if PKs are required we have to insert rows one by one.
             try:
-                if return_pks and self.is_mysql:
+                # MySQL doesn't support RETURNING, so if PKs are required and they can't be derived from the first one
+                # (because conflicts might leave gaps in them, or InnoDB doesn't allocate them as one block), we have to
+                # insert rows one by one (and if there are no rows, there's nothing to insert).
+                step = self._pk_step() if return_pks and self.is_mysql and rows_ and not on_conflict_ else None
+                if return_pks and self.is_mysql and (on_conflict_ or not step):
                     for row in rows_:
                         row[table.pk.name] = None
                     statement = table.insert([], on_conflict_, update_)
@@ -353,15 +554,80 @@ class Database:
                             if pk:  # might be 0 (ON CONFLICT DO NOTHING).
                                 pks.append(pk)
                 else:
-                    statement = table.insert(rows_, on_conflict_, update_, return_pks=return_pks)
-                    with self.execute(statement, autocommit=True) as cursor:
-                        if return_pks:
-                            pks.extend(getattr(row, table.pk.name) for row in cursor)
+                    chunks = self._chunk_rows(rows_, chunk_size)
+                    # If the rows are split into several statements, they're executed in a transaction (which joins the
+                    # active one, if any), so that they're inserted all or nothing.
+                    with self.transaction() if len(chunks) > 1 else nullcontext():
+                        for chunk in chunks:
+                            statement = table.insert(chunk, on_conflict_, update_, return_pks=return_pks)
+                            with self.execute(statement, autocommit=True) as cursor:
+                                if not return_pks:
+                                    continue
+                                if step:
+                                    # The cursor reports the first PK of the block allocated to the chunk.
+                                    pks.extend(range(cursor.lastrowid, cursor.lastrowid + len(chunk) * step, step))
+                                else:
+                                    pks.extend(getattr(row, table.pk.name) for row in cursor)
             except IntegrityError as error:
                 raise self._normalize_integrity_error(error, table, rows_)
+            self._invalidate(table_name)
             event.set(pks=pks or None)
             return pks
 
+    def _pk_step(self) -> int | None:
+        # In the traditional and consecutive lock modes (0 and 1), InnoDB allocates the PKs of a multi-row INSERT whose
+        # number of rows is known in advance as one block, spaced by auto_increment_increment; in the interleaved mode
+        # (2), concurrent inserts might take PKs in between, so there's no step to derive them by.
+        if self._auto_increment is None:
+            statement = "SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode"
+            with self.execute(statement) as cursor:
+                increment, lock_mode = cursor.one()
+            self._auto_increment = int(increment), int(lock_mode)
+        increment, lock_mode = self._auto_increment
+        return increment if lock_mode < 2 else None
+
+    def copy_insert(self, table_name: str, rows: Iterable[Row], *, chunk_size: int = 10_000) -> int:
+        with self._audit("copy_insert", table=table_name) as event:
+            table = self.get_table(table_name)
+            if not self.is_postgresql:
+                # Other databases don't support COPY, so we fall back to inserting the rows in chunks (which still
+                # doesn't require materializing all of them).
+                count = 0
+                with self.transaction():
+                    for chunk in itertools.batched(rows, chunk_size):
+                        self.insert(table_name, *chunk, return_pks=False)
+                        count += len(chunk)
+                event.set(inserted=count)
+                return count
+            columns = [column.name for column in table.table.columns if column is not table.pk]
+            json_columns = {column.name for column in table.table.columns if isinstance(column.type, JSON)}
+            stream = CopyStream((self.serialize(row) for row in rows), columns, json_columns)
+            with self.connection() as connection:
+                # The driver begins its transaction lazily, on the first statement it executes, so we make sure it's
+                # begun before copying through its connection directly.
+                connection.execute(text("SELECT 1"))
+                raw_connection = connection.connection
+                driver_connection: Any = raw_connection.driver_connection
+                try:
+                    if hasattr(driver_connection, "copy_to_table"):
+                        driver_connection.copy_to_table(table.name, source=stream, columns=columns)
+                    else:
+                        preparer = self.engine.dialect.identifier_preparer
+                        column_names = ", ".join(preparer.quote(column) for column in columns)
+                        statement = f"COPY {preparer.format_table(table.table)} ({column_names}) FROM STDIN"
+                        with driver_connection.cursor() as cursor:
+                            cursor.copy_expert(statement, stream)
+                except Exception:
+                    if not self.active_transaction.get():
+                        connection.rollback()
+                    raise
+                if not self.active_transaction.get():
+                    with self._audit("autocommit"):
+                        connection.commit()
+            self._invalidate(table_name)
+            event.set(inserted=stream.count)
+            return stream.count
+
     def update(
         self,
         table_name: str,
@@ -371,33 +637,59 @@ class Database:
         where: Expression | Query | None = None,
         **query: Any,
     ) -> Callable[..., int]:
-        with self._audit("update"):
+        with self._audit("update", table=table_name):
             table = self.get_table(table_name)
             condition = Condition.create(table, where, **query)
             statement = table.update(condition)
 
             def set(**values: Any) -> int:
-                with self._audit("updating") as event:
+                with self._audit("updating", table=table_name) as event:
                     if hook:
                         with self.transaction():
                             with hook(values):
                                 result = self._update(table, statement, values)
                     else:
                         result = self._update(table, statement, values)
+                    self._invalidate(table_name)
                     event.set(updated=result)
                     return result
 
             return set
 
+    def bulk_update(self, table_name: str, *rows: Row, chunk_size: int = 500) -> int:
+        if chunk_size < 1:
+            raise ValueError(f"invalid chunk size {chunk_size!r} (expected a positive integer)")
+        with self._audit("bulk_update", table=table_name) as event:
+            table = self.get_table(table_name)
+            rows_ = [self.serialize(row) for row in rows]
+            for n, row in enumerate(rows_, 1):
+                if not row.get(table.pk_name):
+                    raise ValueError(f"can't update row #{n} of {table} without a PK")
+            # Every changed column of every row binds its PK and its value, and every row binds its PK once more.
+            row_parameters = 2 * max((len(row) for row in rows_), default=1) - 1
+            chunks = self._chunk_rows(rows_, chunk_size, row_parameters) if rows_ else []
+            result = 0
+            with self.transaction():
+                for chunk in chunks:
+                    statement = table.bulk_update(chunk)
+                    with self.execute(statement, autocommit=True) as cursor:
+                        result += cursor.rowcount
+            self._evict(table_name)
+            self._invalidate(table_name)
+            event.set(updated=result)
+            return result
+
     def delete(self, table_name: str, /, *, where: Expression | Query | None = None, **query: Any) -> int:
-        with self._audit("delete") as event:
+        with self._audit("delete", table=table_name) as event:
             table = self.get_table(table_name)
             condition = Condition.create(table, where, **query)
             statement = table.delete(condition)
             with self.execute(statement, autocommit=True) as cursor:
                 result = cursor.rowcount
-                event.set(deleted=result)
-                return result
+            self._evict(table_name, cascade=True)
+            self._invalidate(table_name)
+            event.set(deleted=result)
+            return result
 
     def select(
         self,
@@ -411,16 +703,43 @@ class Database:
         order: str | Iterable[str] | None = None,
         **query: Any,
     ) -> list[Row]:
-        with self._audit("select") as event:
+        with self._audit("select", table=table_name) as event:
             table = self.get_table(table_name)
-            selectors = Selectors.resolve(table, fields)
-            condition = Condition.create(table, where, **query)
-            order_ = Selectors.resolve(table, order)
-            statement = table.select(selectors, condition, limit=limit, offset=offset, order=order_)
+            build = self._select_builder(table, fields, where, order)
+            statement, values = self._statement("select", table, build, fields, where, query, order, limit, offset)
             results: list[Row] = []
             event.set(rows=results)
-            with self.execute(statement, autocommit=False) as cursor:
-                return [self.deserialize(row._asdict()) for row in cursor]
+            with self._read_connection(), self.execute(statement, values, autocommit=False) as cursor:
+                deserialize = self._row_deserializer(statement, cursor.keys())
+                results.extend(map(deserialize, cursor))
+                return results
+
+    def select_columns(
+        self,
+        table_name: str,
+        /,
+        fields: SelectorTypes = True,
+        *,
+        where: Expression | Query | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        order: str | Iterable[str] | None = None,
+        arrays: bool | None = None,
+        **query: Any,
+    ) -> Columns:
+        if arrays is None:
+            arrays = _has_numpy()
+        elif arrays and not _has_numpy():
+            raise ValueError("can't select columns as arrays (NumPy is not installed)")
+        with self._audit("select_columns", table=table_name) as event:
+            table = self.get_table(table_name)
+            build = self._select_builder(table, fields, where, order)
+            statement, values = self._statement("select", table, build, fields, where, query, order, limit, offset)
+            with self._read_connection(), self.execute(statement, values, autocommit=False) as cursor:
+                keys = list(cursor.keys())
+                rows = cursor.fetchall()
+            event.set(rows=len(rows))
+            return self._build_columns(statement, keys, rows, arrays)
 
     def select_one(
         self,
@@ -431,23 +750,143 @@ class Database:
         where: Expression | Query | None = None,
         **query: Any,
     ) -> Row:
-        with self._audit("select_one") as event:
+        with self._audit("select_one", table=table_name) as event:
             table = self.get_table(table_name)
-            selectors = Selectors.resolve(table, fields)
-            condition = Condition.create(table, where, **query)
-            statement = table.select(selectors, condition, limit=1)
-            with self.execute(statement, autocommit=False) as cursor:
+
+            def build(query: dict[str, Any], *_: Any) -> Executable:
+                selectors = Selectors.resolve(table, fields)
+                condition = Condition.create(table, where, **query)
+                return table.select(selectors, condition, limit=1)
+
+            statement, values = self._statement("select_one", table, build, fields, where, query)
+            with self._read_connection(), self.execute(statement, values, autocommit=False) as cursor:
                 row = cursor.first()
                 if row is None:
+                    # The cached statement's condition has placeholders instead of values, so we recreate it here.
+                    condition = Condition.create(table, where, **query)
                     if condition:
                         message = f"{table.name} with {condition} doesn't exist"
                     else:
                         message = f"no {table.plural} exist"
                     raise DoesNotExistError(message)
-                result = self.deserialize(row._asdict())
+                result = self._row_deserializer(statement, cursor.keys())(row)
                 event.set(row=result)
                 return result
 
+    def select_page(
+        self,
+        table_name: str,
+        /,
+        fields: SelectorTypes = True,
+        *,
+        where: Expression | Query | None = None,
+        order: str | Iterable[str] | None = None,
+        cursor: str | None = None,
+        size: int = 100,
+        **query: Any,
+    ) -> tuple[list[Row], str | None]:
+        with self._audit("select_page", table=table_name) as event:
+            table = self.get_table(table_name)
+            selectors = Selectors.resolve(table, fields)
+            condition = Condition.create(table, where, **query)
+            order_ = self._page_order(table, order)
+            seek = self._decode_cursor(order_, cursor) if cursor else []
+            # We fetch one extra row to know whether there's a next page.
+            statement = table.select(selectors, condition, limit=size + 1, order=order_, seek=seek)
+            with self.execute(statement, autocommit=False) as result:
+                page = list(map(self._row_deserializer(statement, result.keys()), result))
+            next_cursor: str | None = None
+            if len(page) > size:
+                page = page[:size]
+                next_cursor = self._encode_cursor(order_, page[-1])
+            for row in page:
+                for n in range(len(order_.selectors)):
+                    del row[SORT_KEY.format(n)]
+            event.set(rows=len(page), cursor=next_cursor)
+            return page, next_cursor
+
+    def stream_select(
+        self,
+        table_name: str,
+        /,
+        fields: SelectorTypes = True,
+        *,
+        where: Expression | Query | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        order: str | Iterable[str] | None = None,
+        batch_size: int = 1000,
+        **query: Any,
+    ) -> Iterator[Row]:
+        with ExitStack() as stack:
+            # The audit event only covers opening the cursor; otherwise, it'd remain active while the stream is
+            # suspended and swallow whatever the caller does between rows.
+            with self._audit("stream_select", table=table_name) as event:
+                table = self.get_table(table_name)
+                build = self._select_builder(table, fields, where, order)
+                statement, values = self._statement("select", table, build, fields, where, query, order, limit, offset)
+                connection = stack.enter_context(self._stream_connection())
+                event.set_statement(statement, values)
+                event.set(batch_size=batch_size)
+                result = connection.execute(statement, values, execution_options={"yield_per": batch_size})
+            deserialize = self._row_deserializer(statement, result.keys())
+            for partition in result.partitions():
+                for row in partition:
+                    yield deserialize(row)
+
+    @overload
+    def prepare(
+        self,
+        table_name: str,
+        /,
+        fields: SelectorTypes = True,
+        *,
+        where: Expression | Query | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        order: str | Iterable[str] | None = None,
+        load: None = None,
+        **query: Any,
+    ) -> PreparedQuery[Row]: ...
+
+    @overload
+    def prepare[T](
+        self,
+        table_name: str,
+        /,
+        fields: SelectorTypes = True,
+        *,
+        where: Expression | Query | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        order: str | Iterable[str] | None = None,
+        load: Loader[T],
+        **query: Any,
+    ) -> PreparedQuery[T]: ...
+
+    def prepare(
+        self,
+        table_name: str,
+        /,
+        fields: SelectorTypes = True,
+        *,
+        where: Expression | Query | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        order: str | Iterable[str] | None = None,
+        load: Loader[Any] | None = None,
+        **query: Any,
+    ) -> PreparedQuery[Any]:
+        table = self.get_table(table_name)
+        selectors = Selectors.resolve(table, fields)
+        condition = Condition.create(table, where, **query)
+        order_ = Selectors.resolve(table, order)
+
+        def build(limit: int | None) -> Executable:
+            return table.select(selectors, condition, limit=limit, offset=offset, order=order_)
+
+        return PreparedQuery(self, table, build, condition, limit, load)
+
     def link(
         self,
         table_name: str,
@@ -455,7 +894,7 @@ class Database:
         sources: Iterable[int],
         targets: Iterable[int],
     ) -> int:
-        with self._audit("link") as event:
+        with self._audit("link", table=table_name) as event:
             table = self.get_table(table_name)
             statement = table.link(m2m_name, sources, targets)
             with self.execute(statement, autocommit=True) as cursor:
@@ -470,7 +909,7 @@ class Database:
         sources: Iterable[int],
         targets: Iterable[int],
     ) -> int:
-        with self._audit("unlink") as event:
+        with self._audit("unlink", table=table_name) as event:
             table = self.get_table(table_name)
             statement = table.unlink(m2m_name, sources, targets)
             with self.execute(statement, autocommit=True) as cursor:
@@ -478,10 +917,92 @@ class Database:
                 event.set(unlinked=result)
                 return result
 
+    def select_links(self, table_name: str, m2m_name: str, targets: Iterable[int]) -> list[tuple[int, int]]:
+        with self._audit("select_links", table=table_name) as event:
+            table = self.get_table(table_name)
+            links: list[tuple[int, int]] = []
+            for chunk in self.chunk_values(list(targets)) or [[]]:
+                statement = table.select_links(m2m_name, chunk)
+                with self.execute(statement, autocommit=False) as cursor:
+                    links.extend((source, target) for source, target in cursor)
+            event.set(links=len(links))
+            return links
+
+    @contextmanager
+    def _stream_connection(self) -> Iterator[Connection]:
+        # Inside a transaction, we have to stream from its connection to see its changes.
+        connection = self.active_connection.get()
+        if connection is not None and self.active_transaction.get() is not None:
+            yield connection
+            return
+        # Otherwise, the stream gets a dedicated connection which is *not* stored for nested calls, so that queries
+        # issued while it's being consumed don't interleave with its server-side cursor.
+        with ExitStack() as stack:
+            with self._audit("connect") as event:
+                connection = stack.enter_context(self._checkout(self.engine))
+                event.set(connection_id=id(connection), connection_uid=str(uuid.uuid4()))
+            yield connection
+
+    @contextmanager
+    def _connect(self, engine: Engine) -> Iterator[Connection]:
+        with self._audit("connect") as event:
+            with self._checkout(engine) as connection:
+                event.set(connection_id=id(connection), connection_uid=str(uuid.uuid4()))
+                if engine is not self.engine:
+                    event.set(replica=engine.url.render_as_string(hide_password=True))
+                token = self.active_connection.set(connection)
+                try:
+                    yield connection
+                finally:
+                    self.active_connection.reset(token)
+
+    def _isolate_connection(self) -> None:
+        # This is called in a fresh context, so that the operation checks out a connection of its own, instead of
+        # sharing the active one (which can't run several statements at once).
+        self.active_connection.set(None)
+
+    @contextmanager
+    def _read_connection(self) -> Iterator[None]:
+        # Reads go to a replica, unless there are none, the primary is forced, or there's already an active connection
+        # (e.g. in a transaction), in which case its changes have to be visible.
+        if not self.replicas or self.primary_reads.get() or self.active_connection.get() is not None:
+            yield
+            return
+        with self._connect(self._choose_replica()):
+            yield
+
+    def _choose_replica(self) -> Engine:
+        if self.replica_routing == "least_busy":
+            return min(self.replicas, key=_checked_out)
+        return self.replicas[next(self._replica_counter) % len(self.replicas)]
+
+    @contextmanager
+    def _checkout(self, engine: Engine) -> Iterator[Connection]:
+        with ExitStack() as stack:
+            # The checkout event only covers waiting for a connection from the pool, to expose connection starvation.
+            with self._audit("checkout") as event:
+                start = time.perf_counter()
+                connection = stack.enter_context(engine.connect())
+                wait_time = time.perf_counter() - start
+                self._checkouts[engine] += 1
+                self._checkout_wait_time[engine] += wait_time
+                self._max_checkout_wait_time[engine] = max(self._max_checkout_wait_time[engine], wait_time)
+                self._checked_out[engine] += 1
+                checked_out = self._checked_out[engine]
+                event.set(wait_time=wait_time, checked_out=checked_out, overflow=self._pool_overflow(engine))
+            try:
+                yield connection
+            finally:
+                self._checked_out[engine] -= 1
+
     @contextmanager
     def _transaction(self, transaction: Transaction) -> Iterator[Transaction]:
         # We store the transaction for nested calls.
         token = self.active_transaction.set(transaction)
+        # Results cached while the transaction was in progress might be stale once it ends (either way), so the tables
+        # it wrote to are invalidated again then.
+        written_tables = self.written_tables.get()
+        written_tables_token = self.written_tables.set(set()) if written_tables is None else None
         try:
             yield transaction
         except Exception:
@@ -497,6 +1018,139 @@ class Database:
                     transaction.commit()
         finally:
             self.active_transaction.reset(token)
+            if written_tables_token is not None:
+                for table_name in self.written_tables.get() or []:
+                    self._invalidate(table_name)
+                self.written_tables.reset(written_tables_token)
+
+    def _statement(
+        self,
+        operation: str,
+        table: Table,
+        build: Callable[[dict[str, Any], Any, Any], Executable],
+        fields: SelectorTypes = None,
+        where: Expression | Query | None = None,
+        query: dict[str, Any] | None = None,
+        order: str | Iterable[str] | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[Executable, dict[str, Any] | None]:
+        query = query or {}
+        key = None
+        if self.statement_cache.size > 0:
+            key = self.statement_cache.key(operation, table, fields, where, query, order, limit, offset)
+        if key is None:
+            return build(query, limit, offset), None
+        cached = self.statement_cache.get(key)
+        if cached is None:
+            cached = self.statement_cache.build(key, build, query, limit, offset)
+        return cached.statement, cached.bind(query, limit, offset)
+
+    def _select_builder(
+        self,
+        table: Table,
+        fields: SelectorTypes,
+        where: Expression | Query | None,
+        order: str | Iterable[str] | None,
+    ) -> Callable[[dict[str, Any], Any, Any], Executable]:
+        def build(query: dict[str, Any], limit: Any, offset: Any) -> Executable:
+            selectors = Selectors.resolve(table, fields)
+            condition = Condition.create(table, where, **query)
+            order_ = Selectors.resolve(table, order)
+            return table.select(selectors, condition, limit=limit, offset=offset, order=order_)
+
+        return build
+
+    def _page_order(self, table: Table, order: str | Iterable[str] | None) -> Selectors:
+        order_ = Selectors.resolve(table, order)
+        # Keyset pagination requires a total order, so we break ties by PK.
+        if any(selector.clause is table.pk for selector in order_.selectors):
+            return order_
+        return Selectors(table, [*order_.selectors, Selector.from_column(table, table.pk_name)])
+
+    def _cursor_order(self, order: Selectors) -> list[str]:
+        return [f"{'-' if selector.desc else '+'}{selector.selector}" for selector in order.selectors]
+
+    def _row_deserializer(self, statement: Executable, keys: Iterable[str]) -> Callable[[Sequence[Any]], Row]:
+        keys = list(keys)
+        conversions = [
+            (n, convert)
+            for n, type_ in enumerate(self._column_types(statement, keys))
+            if (convert := self._converter(type_))
+        ]
+        if not conversions:
+            return lambda row: dict(zip(keys, row))
+
+        def deserialize(row: Sequence[Any]) -> Row:
+            values = list(row)
+            for n, convert in conversions:
+                if values[n] is not None:
+                    values[n] = convert(values[n])
+            return dict(zip(keys, values))
+
+        return deserialize
+
+    def _column_types(self, statement: Executable, keys: list[str]) -> list[Any]:
+        # Rather than checking every value of every row, we check the selected columns' types once and only convert the
+        # values of the columns that need it (columns of unknown types, like some function calls, are checked by value).
+        columns = getattr(statement, "selected_columns", None)
+        if columns is None or len(columns) != len(keys):
+            return [None] * len(keys)
+        return [column.type for column in columns]
+
+    def _converter(self, type_: Any) -> Callable[[Any], Any] | None:
+        if isinstance(type_, DateTime):
+            return _deserialize_datetime
+        if isinstance(type_, JSON):
+            return self.serialization.deserialize
+        if isinstance(type_, SCALAR_TYPES):
+            return None
+        return self._deserialize_value
+
+    def _build_columns(self, statement: Executable, keys: list[str], rows: Sequence[Any], arrays: bool) -> Columns:
+        columns: Columns = {}
+        types = self._column_types(statement, keys)
+        # Transposing the rows builds the columns without creating a dictionary per row.
+        values: list[tuple[Any, ...]] = list(zip(*rows)) if rows else [() for _ in keys]
+        for key, type_, column in zip(keys, types, values):
+            array = _to_array(type_, column) if arrays else None
+            if array is not None:
+                columns[key] = array
+                continue
+            convert = self._converter(type_)
+            if convert is None:
+                columns[key] = list(column)
+            else:
+                columns[key] = [convert(value) if value is not None else None for value in column]
+            if arrays:
+                columns[key] = _to_object_array(columns[key])
+        return columns
+
+    def _deserialize_value(self, value: Any) -> Any:
+        if isinstance(value, dt.datetime):
+            return _deserialize_datetime(value)
+        return self.serialization.deserialize(value)
+
+    def _encode_cursor(self, order: Selectors, row: Row) -> str:
+        values: list[Any] = []
+        for n in range(len(order.selectors)):
+            value = row[SORT_KEY.format(n)]
+            # Datetimes are stored in UTC, but some dialects return them naive.
+            if isinstance(value, dt.datetime) and value.tzinfo is None:
+                value = value.replace(tzinfo=dt.UTC)
+            values.append(value)
+        payload = {"order": self._cursor_order(order), "values": self.serialization.serialize(values)}
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def _decode_cursor(self, order: Selectors, cursor: str) -> list[Any]:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            cursor_order, values = payload["order"], self.serialization.deserialize(payload["values"])
+        except Exception as error:
+            raise ValueError(f"invalid cursor {cursor!r}") from error
+        if cursor_order != self._cursor_order(order):
+            raise ValueError(f"cursor {cursor!r} doesn't match order {and_(self._cursor_order(order))}")
+        return values
 
     def _url_with_driver(self, url: str) -> str:
         scheme, rest = url.split("://", 1)
@@ -517,6 +1171,12 @@ class Database:
     def _audit(self, event: str, /, **data: Any) -> AuditEventBase:
         if self.auditor is None:
             return AuditEventBase()
+        # Only 1 in every N top-level events is audited in full, along with its children; the rest are skipped.
+        parent = AuditEvent._active_event.get()
+        if isinstance(parent, UnsampledAuditEvent):
+            return UnsampledAuditEvent()
+        if parent is None and self.audit_sampling > 1 and next(self._audit_counter) % self.audit_sampling:
+            return UnsampledAuditEvent()
         return AuditEvent(self, event, data)  # type: ignore
 
     def _get_relevant_tables(self, table_names: Iterable[str] | None = None) -> list[Table]:
@@ -529,11 +1189,96 @@ class Database:
                 tables.add(self.get_table(link_table_name))
         return list(tables)
 
+    def _log_slow_query(
+        self,
+        event: AuditEventBase,
+        connection: Connection,
+        cursor: CursorResult,
+        statement: Executable,
+        values: Mapping[str, Any] | None,
+        duration: float,
+    ) -> None:
+        parameters: Any = None
+        try:
+            # The plan is fetched for the statement and parameters exactly as they were sent to the driver (with their
+            # IN lists expanded and their values processed), on the same connection, so as not to wait for another one.
+            context = cursor.context
+            parameters = context.compiled_parameters[0] if context.compiled_parameters else None
+            driver_parameters = context.parameters[0] if context.parameters else ()
+            prefix = "EXPLAIN QUERY PLAN" if self.is_sqlite else "EXPLAIN"
+            # In PostgreSQL, a failed statement aborts the transaction, so the plan is fetched in a savepoint.
+            with connection.begin_nested() if self.is_postgresql else nullcontext():
+                result = connection.exec_driver_sql(f"{prefix} {context.statement}", driver_parameters)
+                plan = "\n".join(self._format_plan_row(row) for row in result)
+        except Exception as error:
+            plan = f"<unavailable: {error}>"
+        operation = _describe_operation()
+        event.set(slow=True, plan=plan)
+        logger.warning(
+            "slow query (%.6f seconds) in %s:\n%s\nvalues: %r\nplan:\n%s",
+            duration,
+            operation or "<unaudited operation>",
+            self._format_clause(cast(ClauseElement, statement), values),
+            parameters,
+            plan,
+            extra={"duration": duration, "operation": operation, "parameters": parameters, "plan": plan},
+        )
+
+    def _invalidate(self, table_name: str) -> None:
+        if not self.result_caches:
+            return
+        written_tables = self.written_tables.get()
+        # Writes might cascade (with ON DELETE CASCADE or SET NULL) to the tables that reference the written one, so
+        # these are invalidated as well.
+        for name in self._referencing_tables(table_name):
+            cache = self.result_caches.get(name)
+            if cache is None:
+                continue
+            cache.invalidate(self.result_cache_namespace(name))
+            if written_tables is not None:
+                written_tables.add(name)
+
+    def _evict(self, table_name: str, cascade: bool = False) -> None:
+        identity_map = IdentityMap.get_active()
+        if identity_map is None:
+            return
+        identity_map.evict(self._referencing_tables(table_name) if cascade else [table_name])
+
+    def _referencing_tables(self, table_name: str) -> list[str]:
+        # Returns the table, along with the tables that reference it, and so on.
+        table_names = [table_name]
+        for name in table_names:
+            for table in self._tables.values():
+                if table.name in table_names:
+                    continue
+                if any(fk.column.table.name == name for fk in table.table.foreign_keys):
+                    table_names.append(table.name)
+        return table_names
+
+    def _pool_overflow(self, engine: Engine) -> int | None:
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return None
+        # The pool's overflow starts at -pool_size and counts up, so it's only positive beyond the pool's size.
+        return max(pool.overflow(), 0)
+
+    def _format_plan_row(self, row: ResultRow) -> str:
+        # SQLite's EXPLAIN QUERY PLAN returns the plan's details along with their IDs, and PostgreSQL returns a single
+        # column; MySQL returns a table, so we format each of its rows as key-value pairs.
+        if self.is_sqlite:
+            return str(row._mapping["detail"])
+        if len(row) == 1:
+            return str(row[0])
+        return ", ".join(f"{key}={value}" for key, value in row._mapping.items())
+
     def _format_clause(self, clause: ClauseElement, values: Mapping[str, Any] | None = None) -> str:
         compiled = cast(SQLCompiler, clause.compile(dialect=self.engine.dialect))
-        parameters = [compiled.binds[name].value for name in compiled.positiontup or []]
-        if values:
-            parameters.extend(values.values())
+        parameters: list[Any] = []
+        for name in compiled.positiontup or []:
+            if values and name in values:
+                parameters.append(values[name])
+            else:
+                parameters.append(compiled.binds[name].value)
         iterator = iter(parameters)
 
         def replace(match: re.Match[str]) -> str:
@@ -556,7 +1301,22 @@ class Database:
                 values[key], _ = value.resolve(table)
         values = self.serialize(values)
         with self.execute(statement.values(values), autocommit=True) as cursor:
-            return cursor.rowcount
+            result = cursor.rowcount
+        self._evict(table.name)
+        return result
+
+    def _chunk_rows(
+        self, rows: list[Row], chunk_size: int | None, row_parameters: int | None = None
+    ) -> list[list[Row]]:
+        if not rows:
+            return [rows]
+        if row_parameters is None:
+            # Every column of every row is a parameter (plus one for the PK that's added on MySQL).
+            row_parameters = max(len(row) for row in rows) + 1
+        size = max(self.max_parameters // row_parameters, 1)
+        if chunk_size is not None:
+            size = min(size, chunk_size)
+        return [rows[offset : offset + size] for offset in range(0, len(rows), size)]
 
     def _normalize_integrity_error(self, error: IntegrityError, table: Table, rows: list[Row]) -> Exception:
         conflicts: dict[str, set[Any]] = {}
@@ -589,3 +1349,54 @@ class Database:
             else:
                 conflict.append(f"{field} in {values}")
         return AlreadyExistsError(f"{table.name} with {and_(conflict)} already exists")
+
+
+def _describe_operation() -> str | None:
+    # The audit event tree (if we're audited) tells which operation, on which table, issued the statement.
+    event = AuditEvent._active_event.get()
+    operations: list[str] = []
+    while isinstance(event, AuditEvent):
+        table = event.data.get("table")
+        operations.append(f"{event.name}({table})" if table else event.name)
+        event = event._parent
+    return " > ".join(reversed(operations)) or None
+
+
+def _deserialize_datetime(value: dt.datetime) -> dt.datetime:
+    # Datetimes are stored in UTC, and returned in local time.
+    return value.replace(tzinfo=dt.UTC).astimezone()
+
+
+def _has_numpy() -> bool:
+    return importlib.util.find_spec("numpy") is not None
+
+
+def _to_array(type_: Any, values: tuple[Any, ...]) -> Any:
+    import numpy
+
+    has_nulls = None in values
+    if isinstance(type_, Boolean) and not has_nulls:
+        return numpy.array(values, dtype=numpy.bool_)
+    if isinstance(type_, Integer) and not has_nulls:
+        return numpy.array(values, dtype=numpy.int64)
+    if isinstance(type_, Float):
+        return numpy.array([numpy.nan if value is None else value for value in values], dtype=numpy.float64)
+    if isinstance(type_, DateTime):
+        # NumPy's datetimes are naive, so they're kept in UTC (which is how they're stored).
+        datetimes = [None if value is None else value.replace(tzinfo=None) for value in values]
+        return numpy.array(datetimes, dtype="datetime64[us]")
+    return None
+
+
+def _to_object_array(values: list[Any]) -> Any:
+    import numpy
+
+    # Assigning the values rather than passing them to the constructor keeps lists from becoming nested arrays.
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _checked_out(engine: Engine) -> int:
+    pool = engine.pool
+    return pool.checkedout() if isinstance(pool, QueuePool) else 0
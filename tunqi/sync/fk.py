@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, ClassVar, Self, overload
 
+from tunqi.core.identity_map import IdentityMap
+
 if TYPE_CHECKING:
     from tunqi.sync.model import Model
 
@@ -87,6 +89,10 @@ class BoundFK[S: Model, T: Model]:
         if self.pk is None:
             return None
         if not self.object or fetch:
+            # Fetching skips the identity map (if any), and maps the fetched model instead of the one it had.
+            identity_map = IdentityMap.get_active()
+            if fetch and identity_map is not None:
+                identity_map.remove(self.model, self.pk)
             self.object = self.model.get(self.pk)
         return self.object
 
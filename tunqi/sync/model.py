@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import datetime as dt
 import pathlib
 from contextlib import contextmanager
 from typing import (
@@ -18,16 +19,22 @@ from typing import (
 from pydantic import BaseModel
 from sqlalchemy import CursorResult, Executable
 
+from tunqi.core.condition import Condition
 from tunqi.core.expression import Expression
+from tunqi.core.identity_map import IdentityMap
 from tunqi.core.query import Query
-from tunqi.core.selector import SelectorTypes
-from tunqi.core.table import Table
+from tunqi.core.result_cache import MISSING
+from tunqi.core.selector import Selectors, SelectorTypes
+from tunqi.core.table import Columns, Table
 from tunqi.orm.annotations import PK
 from tunqi.sync.database import Database
 from tunqi.sync.fk import FK, BoundFK
 from tunqi.sync.model_type import ModelConfig, ModelType
+from tunqi.sync.prepared import PreparedQuery
 from tunqi.utils import and_
 
+CACHEABLE_TYPES = bool, int, float, str, bytes, dt.datetime
+
 
 class Model(BaseModel, metaclass=ModelType, abstract=True):
 
@@ -35,6 +42,7 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
 
     pk: PK | None = None
     _state: dict[str, Any]
+    _prefetched: dict[str, list[Any]]
 
     def __init__(self, *args, **data) -> None:
         self._assign_positional_args(args, data)
@@ -42,6 +50,7 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
         super().__init__(**data)
         self._assign_fks(fks)
         self._state = {}
+        self._prefetched = {}
 
     def __str__(self) -> str:
         attributes = [f"{self.pk or "?"}"]
@@ -105,6 +114,16 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
         with cls._config.database.execute(statement, values, autocommit=autocommit) as cursor:
             yield cursor
 
+    @classmethod
+    def execute_many(
+        cls,
+        statement: str | Executable,
+        rows: Iterable[Mapping[str, Any]],
+        *,
+        chunk_size: int = 1000,
+    ) -> int:
+        return cls._config.database.execute_many(statement, rows, chunk_size=chunk_size)
+
     @classmethod
     def exists(cls, pk: int | None = None, /, *, where: Expression | Query | None = None, **query: Any) -> bool:
         cls._config.define()
@@ -133,6 +152,17 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
             cls._assert_model(n, model, exists=False)
         return cls._create(*models)
 
+    @classmethod
+    def bulk_load(cls, models: Iterable[Model]) -> int:
+        cls._config.define()
+
+        def rows() -> Iterator[dict[str, Any]]:
+            for n, model in enumerate(models, 1):
+                cls._assert_model(n, model, exists=False)
+                yield model._dump_values()
+
+        return cls._config.database.copy_insert(cls._config.table_name, rows())
+
     @classmethod
     def update(
         cls,
@@ -144,6 +174,50 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
         cls._config.define()
         return cls._update(*targets, where=where, **query)
 
+    @classmethod
+    def bulk_update(cls, models: Iterable[Self], fields: Iterable[str] | None = None, *, chunk_size: int = 500) -> int:
+        cls._config.define()
+        models_ = list(models)
+        counter = 1 if len(models_) > 1 else 0
+        for n, model in enumerate(models_, counter):
+            cls._assert_model(n, model, exists=True)
+        fields_ = frozenset(fields) if fields is not None else None
+        if fields_ is not None:
+            columns = cls._config.schema["columns"]
+            for field in fields_:
+                if field not in columns:
+                    raise ValueError(
+                        f"{cls._config.name} has no field {field!r} (available fields are {and_(columns)})"
+                    )
+        models_ = [model for model in models_ if cls._changes(model, fields_)]
+        if not models_:
+            return 0
+        db = cls._config.database
+        states = [model._state.copy() for model in models_]
+        # The hooks run in the same transaction as the update, so if any of them fails, it's rolled back.
+        with db.transaction():
+            try:
+                for model in models_:
+                    model.before_save()
+                    model.before_update()
+                # The hooks might have changed the models, so the changes are collected only after they run.
+                changes = [cls._changes(model, fields_) for model in models_]
+                rows = [{Table.pk_name: model.pk, **values} for model, values in zip(models_, changes) if values]
+                result = db.bulk_update(cls._config.table_name, *rows, chunk_size=chunk_size)
+                # The update evicted the table's models from the identity map (if any), but these are up to date.
+                identity_map = IdentityMap.get_active()
+                for model, values in zip(models_, changes):
+                    model._state.update(values)
+                    if identity_map is not None:
+                        identity_map.add(model)
+                    model.after_update()
+                    model.after_save()
+                return result
+            except Exception:
+                for model, state in zip(models_, states):
+                    model._state = state
+                raise
+
     @classmethod
     def delete_all(
         cls,
@@ -156,15 +230,34 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
         return cls._delete(*targets, where=where, **query)
 
     @classmethod
-    def get(cls, pk: int | None = None, /, *, where: Expression | Query | None = None, **query: Any) -> Self:
+    def get(
+        cls,
+        pk: int | None = None,
+        /,
+        *,
+        where: Expression | Query | None = None,
+        prefetch: Iterable[str] | None = None,
+        validate: bool = True,
+        **query: Any,
+    ) -> Self:
         cls._config.define()
+        # Getting a model by its PK alone can be served by the identity map, without querying the database.
+        identity_map = IdentityMap.get_active()
+        if identity_map is not None and pk is not None and where is None and not query:
+            model = identity_map.get(cls, pk)
+            if model is not None:
+                cls._prefetch([model], prefetch)
+                return model
         if pk is not None:
             query[Table.pk_name] = pk
         query.update(cls.model_query())
-        model_dict = cls._config.database.select_one(cls._config.table_name, where=where, **query)
-        model = cls(**model_dict)
-        model._set_state(model_dict)
-        model = cls._config.deduplicate(model)
+        cache_key = cls._cache_key("get", where, query)
+        model_dict = cls._get_cached(cache_key)
+        if model_dict is MISSING:
+            model_dict = cls._config.database.select_one(cls._config.table_name, where=where, **query)
+            cls._set_cached(cache_key, model_dict)
+        model = cls._load(model_dict, validate)
+        cls._prefetch([model], prefetch)
         return model
 
     @classmethod
@@ -217,25 +310,93 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
         limit: int | None = None,
         offset: int | None = None,
         order: Iterable[str] | None = None,
+        prefetch: Iterable[str] | None = None,
+        validate: bool = True,
         **query: Any,
     ) -> list[Self]:
         cls._config.define()
         query.update(cls.model_query())
-        model_dicts = cls._config.database.select(
+        cache_key = cls._cache_key("all", where, query, limit=limit, offset=offset, order=order)
+        model_dicts = cls._get_cached(cache_key)
+        if model_dicts is MISSING:
+            model_dicts = cls._config.database.select(
+                cls._config.table_name,
+                where=where,
+                limit=limit,
+                offset=offset,
+                order=order,
+                **query,
+            )
+            cls._set_cached(cache_key, model_dicts)
+        models = [cls._load(model_dict, validate) for model_dict in model_dicts]
+        cls._prefetch(models, prefetch)
+        return models
+
+    @classmethod
+    def page(
+        cls,
+        /,
+        *,
+        where: Expression | Query | None = None,
+        order: Iterable[str] | None = None,
+        cursor: str | None = None,
+        size: int = 100,
+        validate: bool = True,
+        **query: Any,
+    ) -> tuple[list[Self], str | None]:
+        cls._config.define()
+        query.update(cls.model_query())
+        model_dicts, next_cursor = cls._config.database.select_page(
+            cls._config.table_name,
+            where=where,
+            order=order,
+            cursor=cursor,
+            size=size,
+            **query,
+        )
+        return [cls._load(model_dict, validate) for model_dict in model_dicts], next_cursor
+
+    @classmethod
+    def stream(
+        cls,
+        /,
+        *,
+        where: Expression | Query | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        order: Iterable[str] | None = None,
+        batch_size: int = 1000,
+        prefetch: Iterable[str] | None = None,
+        validate: bool = True,
+        **query: Any,
+    ) -> Iterator[Self]:
+        cls._config.define()
+        query.update(cls.model_query())
+        model_dicts = cls._config.database.stream_select(
             cls._config.table_name,
             where=where,
             limit=limit,
             offset=offset,
             order=order,
+            batch_size=batch_size,
             **query,
         )
-        models: list[Self] = []
+        if not prefetch:
+            for model_dict in model_dicts:
+                yield cls._load(model_dict, validate)
+            return
+        # Relations are prefetched once per batch, so the models are buffered before they're yielded.
+        batch: list[Self] = []
         for model_dict in model_dicts:
-            model = cls(**model_dict)
-            model._set_state(model_dict)
-            model = cls._config.deduplicate(model)
-            models.append(model)
-        return models
+            batch.append(cls._load(model_dict, validate))
+            if len(batch) == batch_size:
+                cls._prefetch(batch, prefetch)
+                for model in batch:
+                    yield model
+                batch = []
+        cls._prefetch(batch, prefetch)
+        for model in batch:
+            yield model
 
     @classmethod
     def all_fields(
@@ -261,6 +422,63 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
             **query,
         )
 
+    @classmethod
+    def all_columns(
+        cls,
+        /,
+        fields: SelectorTypes = True,
+        *,
+        where: Expression | Query | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        order: Iterable[str] | None = None,
+        arrays: bool | None = None,
+        **query: Any,
+    ) -> Columns:
+        cls._config.define()
+        query.update(cls.model_query())
+        return cls._config.database.select_columns(
+            cls._config.table_name,
+            fields=fields,
+            where=where,
+            limit=limit,
+            offset=offset,
+            order=order,
+            arrays=arrays,
+            **query,
+        )
+
+    @classmethod
+    def prepare(
+        cls,
+        /,
+        *,
+        where: Expression | Query | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        order: Iterable[str] | None = None,
+        prefetch: Iterable[str] | None = None,
+        validate: bool = True,
+        **query: Any,
+    ) -> PreparedQuery[Self]:
+        cls._config.define()
+        query.update(cls.model_query())
+
+        def load(model_dicts: list[dict[str, Any]]) -> list[Self]:
+            models = [cls._load(model_dict, validate) for model_dict in model_dicts]
+            cls._prefetch(models, prefetch)
+            return models
+
+        return cls._config.database.prepare(
+            cls._config.table_name,
+            where=where,
+            limit=limit,
+            offset=offset,
+            order=order,
+            load=load,
+            **query,
+        )
+
     @classmethod
     def refresh_all(cls, *targets: Model) -> None:
         cls._config.define()
@@ -363,9 +581,12 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
         with db.transaction():
             try:
                 pks = db.insert(cls._config.table_name, *states, return_pks=True)
+                identity_map = IdentityMap.get_active()
                 for pk, model, state in zip(pks, models, states):
                     model.pk = pk
                     model._set_state(state)
+                    if identity_map is not None:
+                        identity_map.add(model)
                     model.after_create()
                     model.after_save()
                 return pks
@@ -395,12 +616,16 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
                 model.before_save()
                 model.before_update()
             yield
+            # The update evicted the table's models from the identity map (if any), but these are up to date.
+            identity_map = IdentityMap.get_active()
             try:
                 states: list[dict[str, Any]] = []
                 for model in models:
                     model.set(**values)
                     states.append(model._state.copy())
                     model._state.update(values)
+                    if identity_map is not None:
+                        identity_map.add(model)
                     model.after_update()
                     model.after_save()
             except Exception:
@@ -434,6 +659,10 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
                     model.pk = pk
                 raise
 
+    @classmethod
+    def _changes(cls, model: Self, fields: frozenset[str] | None) -> dict[str, Any]:
+        return {key: new_value for key, (_, new_value) in model.changed().items() if fields is None or key in fields}
+
     @overload
     @classmethod
     def _assert_model(cls, n: int, model: Model, exists: Literal[True]) -> int: ...
@@ -468,6 +697,150 @@ class Model(BaseModel, metaclass=ModelType, abstract=True):
                 models.append(target)
         return pks, models
 
+    @classmethod
+    def _cache_key(
+        cls, operation: str, where: Expression | Query | None, query: dict[str, Any], **options: Any
+    ) -> str | None:
+        # Expressions can't be keyed reliably, and results read in a transaction might never be committed, so these
+        # aren't cached (and neither are queries with non-scalar values).
+        if cls._config.cache is None or where is not None or cls._config.database.active_transaction.get():
+            return None
+        items: list[tuple[str, Any]] = []
+        for key, value in sorted([*query.items(), *options.items()]):
+            if isinstance(value, list | tuple):
+                if not all(isinstance(item, CACHEABLE_TYPES) for item in value):
+                    return None
+                value = tuple(value)
+            elif value is not None and not isinstance(value, CACHEABLE_TYPES):
+                return None
+            items.append((key, value))
+        # Results that depend on other tables (through filters or ordering on their columns) wouldn't be invalidated
+        # when these are written to, so they aren't cached either.
+        table = cls._config.database.get_table(cls._config.table_name)
+        if Condition.create(table, **query).joins or Selectors.resolve(table, options.get("order")).joins:
+            return None
+        return repr((operation, items))
+
+    @classmethod
+    def _get_cached(cls, cache_key: str | None) -> Any:
+        if cache_key is None or cls._config.cache is None:
+            return MISSING
+        db = cls._config.database
+        # The database invalidates the cache whenever the table is written to, so it has to know about it.
+        db.set_result_cache(cls._config.table_name, cls._config.cache)
+        rows = cls._config.cache.get(db.result_cache_namespace(cls._config.table_name), cache_key)
+        if rows is MISSING:
+            return MISSING
+        # Loading a model consumes its row, so we return copies.
+        return [dict(row) for row in rows] if isinstance(rows, list) else dict(rows)
+
+    @classmethod
+    def _set_cached(cls, cache_key: str | None, rows: Any) -> None:
+        if cache_key is None or cls._config.cache is None:
+            return
+        db = cls._config.database
+        rows = [dict(row) for row in rows] if isinstance(rows, list) else dict(rows)
+        cls._config.cache.set(db.result_cache_namespace(cls._config.table_name), cache_key, rows)
+
+    @classmethod
+    def _load(cls, model_dict: dict[str, Any], validate: bool = True) -> Self:
+        model = cls(**model_dict) if validate else cls._construct(model_dict)
+        model._set_state(model_dict)
+        return cls._config.deduplicate(model)
+
+    @classmethod
+    def _construct(cls, model_dict: dict[str, Any]) -> Self:
+        # The row comes from our own schema, so its scalar values are already of the right types, and only its JSON
+        # values have to be validated; the rest is what Pydantic's model_construct does, minus the per-field overhead.
+        json_adapters = cls._config.json_adapters
+        fields: dict[str, Any] = {}
+        for name in cls.__pydantic_fields__:
+            value = model_dict.get(name)
+            if value is not None and name in json_adapters:
+                value = json_adapters[name].validate_python(value)
+            fields[name] = value
+        for fk_name in cls._config.fks:
+            fields[fk_name] = model_dict.get(fk_name)
+        model = cls.__new__(cls)
+        object.__setattr__(model, "__dict__", fields)
+        object.__setattr__(model, "__pydantic_fields_set__", set(cls.__pydantic_fields__))
+        object.__setattr__(model, "__pydantic_extra__", None)
+        object.__setattr__(model, "__pydantic_private__", cls._config.private_defaults())
+        return model
+
+    @classmethod
+    def _prefetch(cls, models: list[Self], prefetch: Iterable[str] | None) -> None:
+        if not prefetch or not models:
+            return
+        # Group the paths by their first relation, so that each relation is loaded once and its nested relations are
+        # prefetched recursively on the loaded models.
+        relations: dict[str, list[str]] = {}
+        for path in prefetch:
+            name, _, nested = path.replace("__", ".").partition(".")
+            relations.setdefault(name, [])
+            if nested:
+                relations[name].append(nested)
+        for name, nested_paths in relations.items():
+            if name in cls._config.fks:
+                cls._prefetch_fk(models, name, nested_paths)
+            elif name in cls._config.backrefs:
+                cls._prefetch_backref(models, name, nested_paths)
+            elif name in cls._config.m2ms:
+                cls._prefetch_m2m(models, name, nested_paths)
+            else:
+                available = and_([*cls._config.fks, *cls._config.backrefs, *cls._config.m2ms])
+                raise ValueError(f"can't prefetch {cls._config.name}.{name} (available relations are {available})")
+
+    @classmethod
+    def _prefetch_fk(cls, models: list[Self], name: str, prefetch: list[str]) -> None:
+        fks: list[BoundFK[Self, Model]] = [getattr(model, name) for model in models]
+        pks = {fk.pk for fk in fks if fk.pk is not None}
+        if not pks:
+            return
+        objects = cls._config.fks[name].model._all_in(Table.pk_name, sorted(pks), prefetch)
+        objects_by_pk = {object.pk: object for object in objects}
+        for fk in fks:
+            if fk.pk in objects_by_pk:
+                fk._object = objects_by_pk[fk.pk]
+
+    @classmethod
+    def _prefetch_backref(cls, models: list[Self], name: str, prefetch: list[str]) -> None:
+        backref = cls._config.backrefs[name]
+        models_by_pk: dict[int | None, Self] = {model.pk: model for model in models}
+        pks = sorted(model.pk for model in models if model.pk)
+        objects = backref.model._all_in(backref.to, pks, prefetch)
+        for model in models:
+            model._prefetched[name] = []
+        for object in objects:
+            fk: BoundFK[Model, Self] = getattr(object, backref.to)
+            # We already have the referenced model, so we might as well attach it.
+            fk._object = models_by_pk[fk.pk]
+            models_by_pk[fk.pk]._prefetched[name].append(object)
+
+    @classmethod
+    def _prefetch_m2m(cls, models: list[Self], name: str, prefetch: list[str]) -> None:
+        m2m = cls._config.m2ms[name]
+        models_by_pk = {model.pk: model for model in models if model.pk}
+        links = cls._config.database.select_links(m2m.model._config.table_name, m2m.to, sorted(models_by_pk))
+        for model in models:
+            model._prefetched[name] = []
+        if not links:
+            return
+        objects = m2m.model._all_in(Table.pk_name, sorted({object_pk for object_pk, _ in links}), prefetch)
+        objects_by_pk = {object.pk: object for object in objects}
+        for object_pk, model_pk in sorted(links):
+            if object_pk in objects_by_pk:
+                models_by_pk[model_pk]._prefetched[name].append(objects_by_pk[object_pk])
+
+    @classmethod
+    def _all_in(cls, field: str, values: list[Any], prefetch: list[str]) -> list[Self]:
+        # The values are split into chunks, so that their IN lists don't exceed the dialect's parameter limit.
+        objects: list[Self] = []
+        for chunk in cls._config.database.chunk_values(values):
+            query: dict[str, Any] = {f"{field}__in": chunk}
+            objects.extend(cls.all(prefetch=prefetch, **query))
+        return objects
+
     def _assign_positional_args(self, args: tuple[Any, ...], data: dict[str, Any]) -> None:
         columns = self._config.schema["columns"]
         if len(args) > len(columns):
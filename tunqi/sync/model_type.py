@@ -5,8 +5,13 @@ from functools import cached_property
 from typing import TYPE_CHECKING, Any, ClassVar, get_type_hints
 from weakref import WeakValueDictionary
 
+from pydantic import TypeAdapter
 from pydantic._internal._model_construction import ModelMetaclass as BaseModelMetaclass
+from pydantic.fields import ModelPrivateAttr
+from pydantic_core import PydanticUndefined
 
+from tunqi.core.identity_map import IdentityMap
+from tunqi.core.result_cache import MemoryCache, ResultCache
 from tunqi.core.table import Table
 from tunqi.orm.annotations import (
     annotation_schema,
@@ -39,6 +44,7 @@ class ModelType(BaseModelMetaclass):
         plural: str | None = None,
         abstract: bool = False,
         deduplicate: bool | None = None,
+        cache: ResultCache | bool = False,
         **kwargs: Any,
     ) -> dict[str, Any]:
         namespace = super().__prepare__(*args, **kwargs)
@@ -56,6 +62,7 @@ class ModelType(BaseModelMetaclass):
         plural: str | None = None,
         abstract: bool = False,
         deduplicate: bool | None = None,
+        cache: ResultCache | bool = False,
         **kwargs: Any,
     ) -> type:
         unique: set[tuple[str, ...]] = attributes.pop(UNIQUE_TOGETHER)
@@ -64,7 +71,7 @@ class ModelType(BaseModelMetaclass):
         model_class: type[Model] = super().__new__(mcs, name, bases, attributes, **kwargs)
         if not hasattr(mcs, "base"):
             mcs.base = model_class  # type: ignore
-        config = ModelConfig(model_class, relations, table_name, plural, unique, deduplicate, abstract)
+        config = ModelConfig(model_class, relations, table_name, plural, unique, deduplicate, abstract, cache)
         config._bind()
         return model_class
 
@@ -80,6 +87,7 @@ class ModelConfig[T: Model]:
         unique: set[tuple[str, ...]],
         deduplicate: bool | None,
         abstract: bool,
+        cache: ResultCache | bool = False,
     ) -> None:
         self.model_class = model_class
         self.name = self.model_class.__name__
@@ -87,6 +95,11 @@ class ModelConfig[T: Model]:
         self.abstract = abstract
         self.table_name = table_name or to_snake_case(self.name)
         self.plural = plural or pluralize(self.table_name)
+        self.cache: ResultCache | None = None
+        if isinstance(cache, ResultCache):
+            self.cache = cache
+        elif cache:
+            self.cache = MemoryCache()
         self.classes: dict[str, type[Model]] = {}
         self.instances: WeakValueDictionary[int, T] = WeakValueDictionary()
         self.fks: dict[str, FK[Model]] = {}
@@ -139,6 +152,28 @@ class ModelConfig[T: Model]:
             "unique": list(self.unique),
         }
 
+    @cached_property
+    def json_adapters(self) -> dict[str, TypeAdapter[Any]]:
+        # JSON columns might hold nested models (or lists, which must not be shared with the model's state), so they're
+        # validated even when models are loaded without validation.
+        adapters: dict[str, TypeAdapter[Any]] = {}
+        for name, column in self.schema["columns"].items():
+            field = self.model_class.model_fields.get(name)
+            if column["type"] == "json" and field is not None and field.annotation is not None:
+                adapters[name] = TypeAdapter(field.annotation)
+        return adapters
+
+    @cached_property
+    def private_attributes(self) -> dict[str, ModelPrivateAttr]:
+        attributes = self.model_class.__private_attributes__.items()
+        return {name: attribute for name, attribute in attributes if attribute.get_default() is not PydanticUndefined}
+
+    def private_defaults(self) -> dict[str, Any]:
+        private: dict[str, Any] = {"_state": {}, "_prefetched": {}}
+        for name, attribute in self.private_attributes.items():
+            private[name] = attribute.get_default()
+        return private
+
     @cached_property
     def unique_columns(self) -> set[str]:
         return {name for name, column in self.schema["columns"].items() if column.get("unique")}
@@ -184,7 +219,13 @@ class ModelConfig[T: Model]:
             cls._config.set_deduplication(deduplicate)
 
     def deduplicate(self, model: T) -> T:
-        if not self._deduplicate or not model.pk:
+        if not model.pk:
+            return model
+        # An active identity map takes precedence, since it's bounded and scoped.
+        identity_map = IdentityMap.get_active()
+        if identity_map is not None:
+            return identity_map.add(model)
+        if not self._deduplicate:
             return model
         if model.pk not in self.instances:
             self.instances[model.pk] = model